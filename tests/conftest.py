@@ -1,4 +1,7 @@
+import threading
+
 import pytest
+from tgtg_server import RequestHandler, create_server
 
 from tgtg_scanner.models import Item
 
@@ -20,6 +23,18 @@ def item_properties():
     }
 
 
+@pytest.fixture
+def tgtg_server():
+    server = create_server(0, favorites=0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield server
+    server.shutdown()
+    server.server_close()
+    RequestHandler.favorites = None
+    RequestHandler.favorites_requests = []
+
+
 @pytest.fixture
 def test_item(tgtg_item: dict):
     return Item(tgtg_item)
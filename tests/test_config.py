@@ -5,6 +5,7 @@ from uuid import uuid4
 
 import pytest
 
+from tgtg_scanner.errors import ConfigurationError
 from tgtg_scanner.models import Config, Cron
 
 SYS_PLATFORM = platform.system()
@@ -77,6 +78,7 @@ def test_ini_get():
             "timeout = 42\n"
             'headers = {"Accept": "json"}\n'
             "cron = * * 1-5 * *\n"
+            "BatchWindow = 500\n"
             'body = {"content": "${{items_available}} panier(s) à ${{price}} € \\nÀ récupérer 🍔"}'
         )
 
@@ -89,6 +91,7 @@ def test_ini_get():
         assert config.webhook.timeout == 42
         assert config.webhook.headers == {"Accept": "json"}
         assert config.webhook.cron == Cron("* * 1-5 * *")
+        assert config.webhook.batch_window == 500
         assert config.webhook.body == '{"content": "${{items_available}} panier(s) à ${{price}} € \nÀ récupérer 🍔"}'
 
 
@@ -98,6 +101,7 @@ def test_env_get(monkeypatch: pytest.MonkeyPatch):
     monkeypatch.setenv("WEBHOOK_TIMEOUT", "42")
     monkeypatch.setenv("WEBHOOK_HEADERS", '{"Accept": "json"}')
     monkeypatch.setenv("WEBHOOK_CRON", "* * 1-5 * *")
+    monkeypatch.setenv("WEBHOOK_BATCH_WINDOW", "500")
     monkeypatch.setenv("WEBHOOK_BODY", '{"content": "${{items_available}} panier(s) à ${{price}} € \\nÀ récupérer 🍔"}')
 
     config = Config()
@@ -107,4 +111,14 @@ def test_env_get(monkeypatch: pytest.MonkeyPatch):
     assert config.webhook.timeout == 42
     assert config.webhook.headers == {"Accept": "json"}
     assert config.webhook.cron == Cron("* * 1-5 * *")
+    assert config.webhook.batch_window == 500
     assert config.webhook.body == '{"content": "${{items_available}} panier(s) à ${{price}} € \nÀ récupérer 🍔"}'
+
+
+def test_batch_body_is_validated(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setenv("CONSOLE_BATCH_BODY", "${{count}} bags: ${{items}} from ${{store_name}}")
+    assert Config().console.batch_body == "${{count}} bags: ${{items}} from ${{store_name}}"
+
+    monkeypatch.setenv("CONSOLE_BATCH_BODY", "${{unknown}}: ${{items}}")
+    with pytest.raises(ConfigurationError, match="CONSOLE_BATCH_BODY"):
+        Config()
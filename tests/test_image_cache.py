@@ -0,0 +1,66 @@
+import pathlib
+import time
+
+import responses
+
+from tgtg_scanner.models.image_cache import ImageCache
+
+URL = "https://images.example.com/logo.png"
+
+
+@responses.activate
+def test_image_cache_hit():
+    responses.add(responses.GET, URL, body=b"image", status=200)
+    cache = ImageCache()
+    assert cache.get(URL) == b"image"
+    assert cache.get(URL) == b"image"
+    assert len(responses.calls) == 1
+
+
+@responses.activate
+def test_image_cache_revalidates_with_etag():
+    responses.add(responses.GET, URL, body=b"image", status=200, headers={"ETag": '"v1"'})
+    cache = ImageCache(ttl=0)
+    assert cache.get(URL) == b"image"
+    responses.replace(responses.GET, URL, status=304)
+    assert cache.get(URL) == b"image"
+    assert responses.calls[1].request.headers["If-None-Match"] == '"v1"'
+    # Cached images are used if revalidation fails
+    responses.replace(responses.GET, URL, status=500)
+    assert cache.get(URL) == b"image"
+
+
+@responses.activate
+def test_image_cache_evicts_least_recently_used():
+    for i in range(3):
+        responses.add(responses.GET, f"{URL}?{i}", body=b"x" * 10, status=200)
+    cache = ImageCache(max_size=25)
+    cache.get(f"{URL}?0")
+    cache.get(f"{URL}?1")
+    cache.get(f"{URL}?0")
+    cache.get(f"{URL}?2")
+    assert list(cache._images) == [f"{URL}?0", f"{URL}?2"]
+    assert cache.size == 20
+
+
+@responses.activate
+def test_image_cache_disk_tier(tmp_path: pathlib.Path):
+    responses.add(responses.GET, URL, body=b"image", status=200, headers={"ETag": '"v1"'})
+    ImageCache(path=str(tmp_path)).get(URL)
+    cache = ImageCache(path=str(tmp_path))
+    assert cache.get(URL) == b"image"
+    assert len(responses.calls) == 1
+
+
+@responses.activate
+def test_image_cache_prefetch():
+    responses.add(responses.GET, URL, body=b"image", status=200)
+    cache = ImageCache()
+    cache.prefetch([URL])
+    deadline = time.monotonic() + 5
+    while URL not in cache._images and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert cache.get(URL) == b"image"
+    cache.prefetch([URL])
+    cache.stop()
+    assert len(responses.calls) == 1
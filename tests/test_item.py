@@ -1,6 +1,13 @@
+import html
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from unittest.mock import PropertyMock
+
 import pytest
+from pytest_mock.plugin import MockerFixture
+from tgtg_server import synthetic_item
 
-from tgtg_scanner.models.item import Item
+from tgtg_scanner.models.item import Item, ItemBatch, ItemSnapshot
 
 
 def test_item(tgtg_item: dict, monkeypatch: pytest.MonkeyPatch):
@@ -25,6 +32,51 @@ def test_item(tgtg_item: dict, monkeypatch: pytest.MonkeyPatch):
     assert item.item_cover == tgtg_item.get("item", {}).get("cover_picture", {}).get("current_url", "-")
 
 
+def test_item_fields_are_lazy(tgtg_item: dict):
+    item = Item(tgtg_item)
+    assert "description" not in vars(item)
+    assert item.description == tgtg_item.get("item", {}).get("description", "-")
+    assert "description" in vars(item)
+
+
+def test_item_snapshots_are_smaller_than_items():
+    item_dicts = [synthetic_item(i) for i in range(1000)]
+
+    def state_size(create) -> int:
+        tracemalloc.start()
+        state = {item_dict["item"]["item_id"]: create(item_dict) for item_dict in item_dicts}
+        size, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert len(state) == len(item_dicts)
+        return size
+
+    assert state_size(ItemSnapshot.from_dict) < state_size(Item) / 2
+
+
+def test_item_fields_are_shared(tgtg_item: dict, mocker: MockerFixture):
+    pickupdate = mocker.patch.object(Item, "pickupdate", new_callable=PropertyMock, return_value="today")
+    item = Item(tgtg_item)
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        messages = list(executor.map(item.unmask, ["${{pickupdate}} ${{price}}"] * 8))
+    assert messages == [f"today {item.price}"] * 8
+    pickupdate.assert_called_once()
+    # A new item version computes its own values
+    assert Item(tgtg_item).field("pickupdate") == "today"
+    assert pickupdate.call_count == 2
+
+
+def test_item_batch_digest(tgtg_item: dict):
+    item = Item(tgtg_item)
+    item.__dict__["display_name"] = "Bread & Butter"
+    batch = ItemBatch([item, item], "<b>${{count}}</b> ${{display_name}}: ${{items}}")
+
+    assert batch.item_id == item.item_id
+    assert batch.unmask("${{display_name}}") == "Bread & Butter"
+    assert batch.digest("<i>${{display_name}}</i>", html.escape, "<br>") == (
+        "<b>2</b> Bread &amp; Butter: <i>Bread &amp; Butter</i><br><i>Bread &amp; Butter</i>"
+    )
+
+
 def test_item_pickupdate_24h_format(tgtg_item: dict):
     """Test pickup date formatting with 24-hour time format."""
     item = Item(tgtg_item, time_format="24h")
@@ -0,0 +1,112 @@
+import asyncio
+import threading
+import time
+from unittest.mock import MagicMock
+
+import pytest
+
+from tgtg_scanner.models import Config
+from tgtg_scanner.notifiers import Notifiers
+from tgtg_scanner.notifiers.notification_queue import NotificationQueue
+
+
+def consume(queue: NotificationQueue, count: int) -> list:
+    async def get_items() -> list:
+        return [await queue.get() for _ in range(count)]
+
+    loop = asyncio.new_event_loop()
+    try:
+        queue.bind(loop)
+        return loop.run_until_complete(get_items())
+    finally:
+        queue.unbind()
+        loop.close()
+
+
+def test_queue_drop_oldest():
+    queue: NotificationQueue[int] = NotificationQueue(maxsize=2)
+    for item in range(4):
+        queue.put(item)
+
+    assert queue.qsize() == 2
+    assert queue.dropped == {"overflow": 2}
+    assert consume(queue, 2) == [2, 3]
+
+
+def test_queue_drop_stale(monkeypatch: pytest.MonkeyPatch):
+    now = 1000.0
+    monkeypatch.setattr("tgtg_scanner.notifiers.notification_queue.monotonic", lambda: now)
+    queue: NotificationQueue[int] = NotificationQueue(maxsize=2, policy="drop_stale", max_age=60)
+    queue.put(0)
+    now += 50
+    queue.put(1)
+    queue.put(2)  # No item expired yet, the new item is discarded
+    now += 20
+    queue.put(3)  # The first item expired
+
+    assert queue.dropped == {"overflow": 1, "expired": 1}
+    assert consume(queue, 2) == [1, 3]
+
+
+def test_queue_expired_items_are_not_delivered(monkeypatch: pytest.MonkeyPatch):
+    now = 1000.0
+    monkeypatch.setattr("tgtg_scanner.notifiers.notification_queue.monotonic", lambda: now)
+    queue: NotificationQueue[int] = NotificationQueue(max_age=60)
+    queue.put(0)
+    now += 61
+    queue.put(1)
+
+    assert consume(queue, 1) == [1]
+    assert queue.dropped == {"expired": 1}
+
+
+def test_queue_block():
+    queue: NotificationQueue[int] = NotificationQueue(maxsize=1, policy="block")
+    loop = asyncio.new_event_loop()
+    queue.bind(loop)
+    queue.put(0)
+    producer = threading.Thread(target=queue.put, args=(1,))
+    producer.start()
+    time.sleep(0.1)
+    assert producer.is_alive()
+
+    assert loop.run_until_complete(queue.get()) == 0
+    producer.join(1)
+    assert not producer.is_alive()
+    assert loop.run_until_complete(queue.get()) == 1
+    assert not queue.dropped
+
+    # producers never wait longer than the block timeout
+    queue.block_timeout = 0.1
+    queue.put(2)
+    start = time.monotonic()
+    queue.put(3)
+    assert time.monotonic() - start < 1
+    assert queue.dropped == {"overflow": 1}
+    assert loop.run_until_complete(queue.get()) == 2
+    queue.unbind()
+    loop.close()
+
+
+def test_queue_stop_signal_is_never_dropped():
+    queue: NotificationQueue[int] = NotificationQueue(maxsize=1)
+    queue.put(0)
+    queue.put(None)
+
+    assert not queue.dropped
+    assert consume(queue, 2) == [0, None]
+
+
+def test_notifiers_export_queue_metrics():
+    config = Config()
+    config.console.enabled = True
+    config.console.queue_size = 1
+    metrics = MagicMock()
+    notifiers = Notifiers(config, MagicMock(), MagicMock())
+    notifiers.watch_queues(metrics)
+    console = notifiers._enabled_notifiers[0]
+    console.queue.put(MagicMock())
+    console.queue.put(MagicMock())
+
+    metrics.notifier_queue_depth.labels.assert_called_once_with("Console")
+    metrics.count_dropped_notification.assert_called_once_with("Console", "overflow")
@@ -1,14 +1,21 @@
 import json
 import platform
-from time import sleep
-from unittest.mock import MagicMock
+import statistics
+import threading
+from time import perf_counter, sleep
+from unittest.mock import AsyncMock, MagicMock
 
 import pytest
 import responses
+from discord import TextChannel
 from pytest_mock.plugin import MockerFixture
+from telegram.error import NetworkError
 
-from tgtg_scanner.models import Config, Cron, Favorites, Item, Reservations
+from tgtg_scanner.models import Config, Cron, Favorites, Item, ItemBatch, Reservations
+from tgtg_scanner.models.reservations import Reservation
+from tgtg_scanner.notifiers import Notifiers
 from tgtg_scanner.notifiers.apprise import Apprise
+from tgtg_scanner.notifiers.base import Notifier
 from tgtg_scanner.notifiers.console import Console
 from tgtg_scanner.notifiers.discord import Discord
 from tgtg_scanner.notifiers.ifttt import IFTTT
@@ -66,6 +73,27 @@ def test_webhook_json(test_item: Item, reservations: Reservations, favorites: Fa
     }
 
 
+@responses.activate
+def test_webhook_json_batch(test_item: Item, reservations: Reservations, favorites: Favorites):
+    config = Config()
+    config.webhook.enabled = True
+    config.webhook.url = "https://api.example.com"
+    config.webhook.type = "application/json"
+    config.webhook.cron = Cron()
+    config.webhook.body = '{"id": "${{item_id}}", "amount": ${{items_available}}}'
+    config.webhook.batch_window = 200
+    responses.add(responses.POST, "https://api.example.com", status=200)
+
+    webhook = WebHook(config, reservations, favorites)
+    webhook.start()
+    for _ in range(3):
+        webhook.send(test_item)
+    webhook.stop()
+
+    assert len(responses.calls) == 1
+    assert json.loads(responses.calls[0].request.body) == [{"id": test_item.item_id, "amount": test_item.items_available}] * 3
+
+
 @responses.activate
 def test_webhook_text(test_item: Item, reservations: Reservations, favorites: Favorites):
     config = Config()
@@ -208,6 +236,30 @@ def test_console(
     assert captured.out.rstrip() == f"{test_item.display_name} - new amount: {test_item.items_available}"
 
 
+def test_console_batch(
+    test_item: Item,
+    reservations: Reservations,
+    favorites: Favorites,
+    capsys: pytest.CaptureFixture,
+):
+    config = Config()
+    config.console.enabled = True
+    config.console.cron = Cron()
+    config.console.body = "${{display_name}}"
+    config.console.batch_window = 200
+    config.console.batch_size = 2
+    config.console.batch_body = "${{count}} new bags:\n${{items}}"
+
+    console = Console(config, reservations, favorites)
+    console.start()
+    for _ in range(3):
+        console.send(test_item)
+    console.stop()
+
+    name = test_item.display_name
+    assert capsys.readouterr().out.rstrip() == f"2 new bags:\n{name}\n\n{name}\n{name}"
+
+
 def test_script(
     test_item: Item,
     reservations: Reservations,
@@ -230,6 +282,136 @@ def test_script(
     assert captured.out.decode(encoding).rstrip() == test_item.display_name
 
 
+def test_notifiers_share_dispatcher(
+    test_item: Item,
+    reservations: Reservations,
+    favorites: Favorites,
+    capsys: pytest.CaptureFixture,
+):
+    config = Config()
+    config.console.enabled = True
+    config.console.cron = Cron()
+    config.console.body = "${{display_name}}"
+    config.script.enabled = True
+    config.script.cron = Cron()
+    config.script.command = "echo ${{item_id}}"
+
+    notifiers = Notifiers(config, reservations, favorites)
+    notifiers.start()
+    notifier_threads = [thread for thread in threading.enumerate() if thread.name == "tgtg-notifiers"]
+    notifiers.send(test_item)
+    notifiers.stop()
+
+    assert len(notifier_threads) == 1
+    assert all(notifier.dispatcher is notifiers.dispatcher for notifier in notifiers._enabled_notifiers)
+    assert capsys.readouterr().out.rstrip() == test_item.display_name
+    assert not notifiers.dispatcher.running
+
+
+class RecordingNotifier(Notifier):
+    def __init__(self, config: Config, reservations: Reservations, favorites: Favorites):
+        super().__init__(config, reservations, favorites)
+        self.enabled = True
+        self.received: list[tuple[float, Item | ItemBatch | Reservation]] = []
+        self.event = threading.Event()
+        self.failures = 0
+
+    async def _send(self, item: Item | ItemBatch | Reservation) -> None:
+        if self.failures > 0:
+            self.failures -= 1
+            raise ConnectionError("Service unavailable")
+        self.received.append((perf_counter(), item))
+        self.event.set()
+
+    def __repr__(self) -> str:
+        return "Recording"
+
+
+def test_notifier_queue_survives_restart(test_item: Item, reservations: Reservations, favorites: Favorites):
+    notifier = RecordingNotifier(Config(), reservations, favorites)
+    notifier.send(test_item)
+    notifier.start()
+    assert notifier.event.wait(1)
+    notifier.stop()
+
+    notifier.event.clear()
+    notifier.send(test_item)
+    notifier.start()
+    assert notifier.event.wait(1)
+    notifier.stop()
+
+    assert [item for _, item in notifier.received] == [test_item, test_item]
+
+
+def test_notifier_runs_blocking_calls_off_the_loop(reservations: Reservations, favorites: Favorites):
+    notifier = RecordingNotifier(Config(), reservations, favorites)
+    notifier.start()
+    assert notifier.dispatcher is not None
+    loop_thread = notifier.dispatcher._thread
+    assert loop_thread is not None
+    # e.g. favorites requests of bot commands
+    thread_id = notifier.dispatcher.submit(notifier._run_sync(threading.get_ident)).result(1)
+    notifier.stop()
+
+    assert thread_id != loop_thread.ident
+
+
+def test_notifier_retries_without_blocking(test_item: Item, reservations: Reservations, favorites: Favorites):
+    notifier = RecordingNotifier(Config(), reservations, favorites)
+    notifier.failures = 1
+    notifier.retry_delay = 0.1
+    reservation = Reservation(test_item.item_id, 1, test_item.display_name)
+    notifier.start()
+    notifier.send(test_item)
+    notifier.send(reservation)
+    sleep(0.5)
+    notifier.stop()
+
+    # The reservation is sent while the failed item waits for its retry
+    assert [item for _, item in notifier.received] == [reservation, test_item]
+
+
+def test_notifier_dead_letters(test_item: Item, reservations: Reservations, favorites: Favorites, tmp_path):
+    config = Config()
+    config.token_path = str(tmp_path)
+    notifier = RecordingNotifier(config, reservations, favorites)
+    notifier.failures = 10
+    notifier.retries = 1
+    notifier.retry_delay = 0.05
+    notifier.start()
+    notifier.send(test_item)
+    sleep(0.5)
+    # Pending retries are written on stop
+    notifier.retry_delay = 60
+    notifier.send(test_item)
+    sleep(0.1)
+    notifier.stop()
+
+    lines = (tmp_path / "notifierDeadLetters.jsonl").read_text(encoding="utf-8").splitlines()
+    entries = [json.loads(line) for line in lines]
+    assert [entry["attempts"] for entry in entries] == [2, 1]
+    assert all(entry["notifier"] == "RecordingNotifier" for entry in entries)
+    assert all(entry["error"] == "ConnectionError: Service unavailable" for entry in entries)
+    assert all(entry["item"] == test_item.data for entry in entries)
+    assert not notifier.received
+
+
+def test_notifier_latency(test_item: Item, reservations: Reservations, favorites: Favorites):
+    notifier = RecordingNotifier(Config(), reservations, favorites)
+    notifier.start()
+    latencies = []
+    for _ in range(200):
+        notifier.event.clear()
+        start = perf_counter()
+        notifier.send(test_item)
+        assert notifier.event.wait(1)
+        latencies.append((notifier.received[-1][0] - start) * 1000)
+    notifier.stop()
+
+    # Items are handed to the event loop right away instead of being polled every second
+    assert statistics.median(latencies) < 100
+
+
 def test_smtp(test_item: Item, reservations: Reservations, favorites: Favorites, mocker: MockerFixture):
     mock_SMTP = mocker.MagicMock(name="tgtg_scanner.notifiers.smtp.smtplib.SMTP")
     mocker.patch("tgtg_scanner.notifiers.smtp.smtplib.SMTP", new=mock_SMTP)
@@ -321,9 +503,36 @@ def test_telegram(test_item: Item, reservations: Reservations, favorites: Favori
     telegram.start()
     telegram.send(test_item)
     sleep(0.5)
-    assert telegram.thread.is_alive()
+    assert telegram.task is not None and not telegram.task.done()
     telegram.stop()
-    assert not telegram.thread.is_alive()
+    assert telegram.task.done()
+
+
+def test_telegram_retries_failed_chats(test_item: Item, reservations: Reservations, favorites: Favorites, mocked_telegram):
+    config = Config()
+    config.telegram.enabled = True
+    config.telegram.token = "1234567890:ABCDEF"
+    config.telegram.chat_ids = ["1", "2"]
+    config.telegram.body = "New Magic Bags: ${{items_available}}"
+    config.telegram.image = None
+    config.telegram.retry_delay = 0
+    chat_ids: list[str] = []
+
+    def send_message(*_, chat_id: str, **__) -> None:
+        chat_ids.append(chat_id)
+        if chat_id == "2" and chat_ids.count("2") == 1:
+            raise NetworkError("Bad Gateway")
+
+    mocked_telegram.patch("telegram.Bot.send_message", side_effect=send_message)
+    telegram = Telegram(config, reservations, favorites)
+    telegram.start()
+    telegram.send(test_item)
+    deadline = perf_counter() + 5
+    while len(chat_ids) < 3 and perf_counter() < deadline:
+        sleep(0.01)
+    telegram.stop()
+
+    assert chat_ids == ["1", "2", "2"]
 
 
 @pytest.fixture
@@ -344,10 +553,6 @@ def mocked_discord(mocker: MockerFixture):
         "discord.ext.commands.Bot.event",
         return_value=MagicMock(),
     )
-    mocker.patch(
-        "discord.ext.commands.Bot.dispatch",
-        return_value=None,
-    )
     mocker.patch(
         "aiohttp.BaseConnector.close",
         return_value=None,
@@ -361,8 +566,24 @@ def test_discord(test_item: Item, reservations: Reservations, favorites: Favorit
     config.discord.channel = 123456789012345678
     config.discord.token = "ABCDEFGHIJKLMNOPQRSTUVWXYZ.123456.ABCDEFGHIJKLMNOPQRSTUVWXYZABCDEFGHIJKL"
 
+    channel = MagicMock(spec=TextChannel)
+    channel.send = AsyncMock()
+    mocked_discord.patch("discord.ext.commands.Bot.get_channel", return_value=channel)
+
     discord = Discord(config, reservations, favorites)
     discord.start()
+    deadline = perf_counter() + 5
+    while discord._bot_task is None and perf_counter() < deadline:
+        sleep(0.01)
     discord.send(test_item)
-    sleep(0.5)
+    sleep(0.1)
+    # Notifications wait for the bot to be connected
+    channel.send.assert_not_awaited()
+    assert discord.dispatcher is not None and discord.dispatcher.loop is not None
+    discord.dispatcher.loop.call_soon_threadsafe(discord._ready.set)
+    deadline = perf_counter() + 5
+    while not channel.send.await_count and perf_counter() < deadline:
+        sleep(0.01)
     discord.stop()
+
+    channel.send.assert_awaited_once_with(test_item.unmask(config.discord.body))
@@ -26,15 +26,80 @@ def test_make_orders(reservations: Reservations, tgtg_item: dict):
     callback_mock.assert_called_once_with(Reservation("123", 1, "Test Item"))
 
 
+def test_make_order_keeps_failed_reservation(reservations: Reservations):
+    callback_mock = MagicMock()
+    reservations.client.create_order.side_effect = Exception("Sold out")  # type: ignore[attr-defined]
+    reservations.reserve("123", "Test Item")
+    assert not reservations.make_order("123", callback_mock)
+    assert reservations.reservation_query == [Reservation("123", 1, "Test Item")]
+    callback_mock.assert_not_called()
+
+    reservations.client.create_order.side_effect = None  # type: ignore[attr-defined]
+    reservations.client.create_order.return_value = {"id": "1"}  # type: ignore[attr-defined]
+    assert reservations.make_order("123", callback_mock)
+    assert not reservations.make_order("123", callback_mock)
+    callback_mock.assert_called_once()
+
+
+def test_reserve_replaces_pending_reservation(reservations: Reservations):
+    reservations.reserve("123", "Test Item")
+    reservations.reserve("123", "Test Item", amount=2, priority=1)
+    reservations.reserve("456", "Other Item")
+    assert reservations.reservation_query == [Reservation("123", 2, "Test Item", 1), Reservation("456", 1, "Other Item")]
+    reservations.remove("123")
+    assert reservations.item_ids == ["456"]
+    assert not reservations.is_reserved("123")
+
+
+def test_make_order_limits_amount(reservations: Reservations):
+    callback_mock = MagicMock()
+    reservations.client.create_order.return_value = {"id": "1"}  # type: ignore[attr-defined]
+    reservations.reserve("123", "Test Item", amount=3)
+    assert reservations.make_order("123", callback_mock, items_available=2)
+    reservations.client.create_order.assert_called_once_with("123", 2)  # type: ignore[attr-defined]
+    callback_mock.assert_called_once_with(Reservation("123", 2, "Test Item"))
+    assert reservations.reservation_query == [Reservation("123", 1, "Test Item")]
+
+
+def test_make_orders_only_changed_items(reservations: Reservations, tgtg_item: dict):
+    callback_mock = MagicMock()
+    reservations.client.create_order.return_value = {"id": "1"}  # type: ignore[attr-defined]
+    reservations.reserve("123", "Test Item")
+    reservations.reserve("456", "Other Item", priority=1)
+    item = Item(tgtg_item)
+    state = {"123": item, "456": item}
+    # New reservations are ordered by priority
+    reservations.client.create_order.side_effect = [Exception("Sold out"), {"id": "1"}]  # type: ignore[attr-defined]
+    reservations.make_orders(state, callback_mock, ())
+    assert [call.args[0] for call in reservations.client.create_order.call_args_list] == ["456", "123"]  # type: ignore[attr-defined]
+    assert reservations.item_ids == ["456"]
+
+    # Reservations of unknown or unchanged items wait until their items change
+    reservations.reserve("789", "Third Item")
+    reservations.make_orders({"123": item}, callback_mock, ())
+    reservations.client.create_order.reset_mock(side_effect=True)  # type: ignore[attr-defined]
+    reservations.make_orders(state, callback_mock, ["123"])
+    reservations.client.create_order.assert_not_called()  # type: ignore[attr-defined]
+    reservations.make_orders(state, callback_mock, ["456"])
+    reservations.client.create_order.assert_called_once_with("456", 1)  # type: ignore[attr-defined]
+    assert reservations.item_ids == ["789"]
+
+
 def test_update_active_orders(reservations: Reservations):
     order = Order("1", "123", 1, "Test Item")
-    reservations.client.get_order_status.return_value = {"state": "RESERVED"}  # type: ignore[attr-defined]
-    reservations.active_orders = {order.id: order}
+    order2 = Order("2", "456", 1, "Other Item")
+    reservations.client.get_active_orders.return_value = [  # type: ignore[attr-defined]
+        {"order_id": "1", "state": "RESERVED"},
+        {"order_id": "2", "state": "CANCELLED"},
+    ]
+    reservations.active_orders = {order.id: order, order2.id: order2}
     reservations.update_active_orders()
-    assert len(reservations.active_orders) == 1
-    reservations.client.get_order_status.return_value = {"state": "CANELLED"}  # type: ignore[attr-defined]
+    assert list(reservations.active_orders) == ["1"]
+    reservations.client.get_active_orders.return_value = []  # type: ignore[attr-defined]
     reservations.update_active_orders()
     assert len(reservations.active_orders) == 0
+    assert reservations.client.get_active_orders.call_count == 2  # type: ignore[attr-defined]
+    reservations.client.get_order_status.assert_not_called()  # type: ignore[attr-defined]
 
 
 def test_cancel_order(reservations: Reservations):
@@ -48,3 +113,4 @@ def test_cancel_all_orders(reservations: Reservations):
     order2 = Order("2", "123", 2, "Test Item 2")
     reservations.active_orders = {order1.id: order1, order2.id: order2}
     reservations.cancel_all_orders()
+    assert sorted(call.args[0] for call in reservations.client.abort_order.call_args_list) == ["1", "2"]  # type: ignore[attr-defined]
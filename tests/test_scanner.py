@@ -0,0 +1,247 @@
+from threading import Event, Thread, current_thread
+from time import monotonic, sleep
+from unittest.mock import MagicMock
+
+import pytest
+from pytest_mock.plugin import MockerFixture
+
+from tgtg_scanner.errors import TgtgAPIError
+from tgtg_scanner.models import Config, Item, ItemSnapshot
+from tgtg_scanner.models.reservations import Reservation
+from tgtg_scanner.scanner import FAVORITES, Scanner
+
+
+def _item_dict(tgtg_item: dict, item_id: str, items_available: int = 0) -> dict:
+    return tgtg_item | {"item": tgtg_item["item"] | {"item_id": item_id}, "items_available": items_available}
+
+
+@pytest.fixture
+def scanner(mocker: MockerFixture):
+    mocker.patch("tgtg_scanner.scanner.Metrics")
+    config = Config()
+    config.workers = 4
+    scanner = Scanner(config)
+    scanner.notifiers = MagicMock()
+    yield scanner
+    scanner.stop()
+
+
+def test_poll_skips_failing_items(scanner: Scanner, tgtg_item: dict):
+    scanner.item_ids = ["1", "2"]
+
+    def get_item(item_id: str) -> dict:
+        if item_id == "1":
+            raise TgtgAPIError(500, "Error")
+        return _item_dict(tgtg_item, item_id)
+
+    scanner.tgtg_client.get_item = MagicMock(side_effect=get_item)  # type: ignore[method-assign]
+    scanner.tgtg_client.get_favorites = MagicMock(return_value=[])  # type: ignore[method-assign]
+    for key in [FAVORITES, *scanner.item_ids]:
+        scanner._poll(key)
+
+    assert list(scanner.state) == ["2"]
+    assert sorted(key for _, key in scanner._queue) == ["1", "2", FAVORITES]
+
+
+def test_poll_skips_unchanged_items(scanner: Scanner, tgtg_item: dict, mocker: MockerFixture):
+    item_class = mocker.patch("tgtg_scanner.scanner.Item", wraps=Item)
+    favorites = [_item_dict(tgtg_item, str(item_id)) for item_id in range(10)]
+    scanner.tgtg_client.get_favorites = MagicMock(return_value=favorites)  # type: ignore[method-assign]
+    scanner._poll(FAVORITES)
+    assert item_class.call_count == 10
+    scanner.metrics.items_changed.inc.assert_called_with(10)  # type: ignore[attr-defined]
+
+    item_class.reset_mock()
+    favorites[3] = _item_dict(tgtg_item, "3", items_available=2)
+    scanner._poll(FAVORITES)
+    assert item_class.call_count == 1
+    assert scanner.state["3"].items_available == 2
+    scanner.metrics.items_changed.inc.assert_called_with(1)  # type: ignore[attr-defined]
+    scanner.metrics.items_unchanged.inc.assert_called_with(9)  # type: ignore[attr-defined]
+    scanner.notifiers.send.assert_called_once()  # type: ignore[union-attr]
+
+
+def test_poll_favorites_skips_configured_items(scanner: Scanner, tgtg_item: dict, mocker: MockerFixture):
+    scanner.item_ids = ["1"]
+    item_class = mocker.patch("tgtg_scanner.scanner.Item", wraps=Item)
+    favorites = [_item_dict(tgtg_item, "1"), _item_dict(tgtg_item, "2")]
+    scanner.tgtg_client.get_favorites = MagicMock(return_value=favorites)  # type: ignore[method-assign]
+    scanner._poll(FAVORITES)
+
+    assert item_class.call_count == 1
+    assert list(scanner.state) == ["2"]
+
+
+def test_notifications_are_sent_without_state_lock(scanner: Scanner, tgtg_item: dict):
+    scanner._update([_item_dict(tgtg_item, "1")])
+    locked = []
+    scanner.notifiers.send.side_effect = lambda item: locked.append(scanner._state_lock.locked())  # type: ignore[union-attr]
+    scanner._update([_item_dict(tgtg_item, "1", items_available=1)])
+
+    assert locked == [False]
+
+
+def test_changed_pickup_interval_is_stored(scanner: Scanner, tgtg_item: dict, mocker: MockerFixture):
+    scanner._update([_item_dict(tgtg_item, "1", items_available=1)])
+    item_class = mocker.patch("tgtg_scanner.scanner.Item", wraps=Item)
+    moved = _item_dict(tgtg_item, "1", items_available=1) | {
+        "pickup_interval": {"start": "2030-01-01T10:00:00Z", "end": "2030-01-01T11:00:00Z"}
+    }
+    for _ in range(3):
+        scanner._update([moved])
+
+    assert item_class.call_count == 1
+    assert scanner.state["1"].fingerprint == ItemSnapshot.from_dict(moved).fingerprint
+
+
+def test_poll_slow_item_does_not_delay_others(scanner: Scanner, tgtg_item: dict):
+    scanner.item_ids = ["1", "2", "3"]
+    slow_item = Event()
+
+    def get_item(item_id: str) -> dict:
+        if item_id == "1":
+            slow_item.wait(5)
+        return _item_dict(tgtg_item, item_id)
+
+    scanner.tgtg_client.get_item = MagicMock(side_effect=get_item)  # type: ignore[method-assign]
+    scanner.tgtg_client.get_favorites = MagicMock(return_value=[])  # type: ignore[method-assign]
+    for key in [FAVORITES, *scanner.item_ids]:
+        scanner._schedule(key, 0)
+    scanner._dispatch()
+
+    deadline = monotonic() + 5
+    while len(scanner._queue) < 3 and monotonic() < deadline:
+        sleep(0.01)
+    assert sorted(key for _, key in scanner._queue) == ["2", "3", FAVORITES]
+    assert "1" not in scanner.state
+    slow_item.set()
+
+
+def test_poll_uses_item_intervals(scanner: Scanner, tgtg_item: dict):
+    scanner.scheduler.item_intervals = {"1": 5}
+    scanner.tgtg_client.get_item = MagicMock(return_value=_item_dict(tgtg_item, "1"))  # type: ignore[method-assign]
+    scanner.tgtg_client.get_favorites = MagicMock(return_value=[_item_dict(tgtg_item, "2")])  # type: ignore[method-assign]
+    start = monotonic()
+    scanner._poll("1")
+    scanner._poll(FAVORITES)
+
+    due = dict((key, due - start) for due, key in scanner._queue)
+    assert 4.5 <= due["1"] <= 5.5
+    assert 54 <= due[FAVORITES] <= 66.5
+    assert list(scanner.state) == ["1", "2"]
+
+
+def test_poll_waits_for_captcha_cooldown(scanner: Scanner, tgtg_item: dict):
+    scanner.state["1"] = ItemSnapshot.from_dict(_item_dict(tgtg_item, "1", items_available=1))
+    scanner.tgtg_client.get_item = MagicMock()  # type: ignore[method-assign]
+    scanner.tgtg_client.cooldown_until = monotonic() + 300
+    scanner._poll("1")
+
+    scanner.tgtg_client.get_item.assert_not_called()
+    assert scanner.state["1"].items_available == 1
+    assert scanner._queue[0][0] - monotonic() == pytest.approx(300, abs=5)
+
+
+def test_check_item_orders_reserved_item(scanner: Scanner, tgtg_item: dict):
+    scanner.reservations.reserve("1", "Test Item")
+    scanner.tgtg_client.create_order = MagicMock(return_value={"id": "order"})  # type: ignore[method-assign]
+    scanner._update([_item_dict(tgtg_item, "1", items_available=1)])
+    # wait for the queued orders
+    scanner.order_executor.submit(lambda: None).result()
+
+    scanner.tgtg_client.create_order.assert_called_once_with("1", 1)
+    scanner.metrics.order_latency.observe.assert_called_once()  # type: ignore[attr-defined]
+    scanner.notifiers.send.assert_called_once_with(Reservation("1", 1, "Test Item"))  # type: ignore[union-attr]
+    assert scanner.reservations.reservation_query == []
+    assert "order" in scanner.reservations.active_orders
+
+
+def test_reservation_loop_polls_reserved_items(scanner: Scanner, tgtg_item: dict):
+    scanner.config.reservation_sleep_time = 0.01  # type: ignore[assignment]
+    scanner.state["1"] = ItemSnapshot.from_dict(_item_dict(tgtg_item, "1"))
+    scanner.reservations.reserve("1", "Test Item")
+    ordered = Event()
+    fetch_threads = []
+
+    def get_item(item_id: str) -> dict:
+        fetch_threads.append(current_thread())
+        return _item_dict(tgtg_item, item_id, items_available=1)
+
+    scanner.tgtg_client.get_item = MagicMock(side_effect=get_item)  # type: ignore[method-assign]
+
+    def create_order(*_) -> dict:
+        ordered.set()
+        return {"id": "order"}
+
+    scanner.tgtg_client.create_order = MagicMock(side_effect=create_order)  # type: ignore[method-assign]
+    loop = Thread(target=scanner._reservation_loop, daemon=True)
+    loop.start()
+
+    assert ordered.wait(5)
+    scanner.tgtg_client.get_item.assert_called_with("1")
+    # Reserved items are not fetched by the shared poll workers
+    assert fetch_threads[0] is loop
+
+
+def test_state_snapshot_restores_state(mocker: MockerFixture, tgtg_item: dict, tmp_path):
+    mocker.patch("tgtg_scanner.scanner.Metrics")
+    config = Config()
+    config.token_path = str(tmp_path)
+    config.state_snapshot_interval = 1
+    mocker.patch.object(config, "save_tokens")
+    scanner = Scanner(config)
+    scanner.notifiers = MagicMock()
+    scanner.tgtg_client.get_favorites = MagicMock(return_value=[_item_dict(tgtg_item, "1")])  # type: ignore[method-assign]
+    scanner._poll(FAVORITES)
+    scanner.stop()
+
+    # Restocked while the scanner was down
+    restarted = Scanner(config)
+    restarted.notifiers = MagicMock()
+    restarted.tgtg_client.get_favorites = MagicMock(  # type: ignore[method-assign]
+        return_value=[_item_dict(tgtg_item, "1", items_available=2), _item_dict(tgtg_item, "2", items_available=1)]
+    )
+    restarted._poll(FAVORITES)
+    restarted.stop()
+    restarted.notifiers.send.assert_called_once()
+    assert restarted.notifiers.send.call_args.args[0].item_id == "1"
+
+
+def test_state_snapshot_cycles_per_favorites_poll(scanner: Scanner, tgtg_item: dict, mocker: MockerFixture):
+    cycle = mocker.patch.object(scanner.snapshot, "cycle")
+    scanner.tgtg_client.get_item = MagicMock(return_value=_item_dict(tgtg_item, "1"))  # type: ignore[method-assign]
+    scanner.tgtg_client.get_favorites = MagicMock(return_value=[_item_dict(tgtg_item, "2")])  # type: ignore[method-assign]
+    for _ in range(3):
+        scanner._poll("1")
+    cycle.assert_not_called()
+
+    scanner._poll(FAVORITES)
+    cycle.assert_called_once()
+
+
+def test_dispatch_polls_every_item_once_per_cycle(mocker: MockerFixture, tgtg_server):
+    mocker.patch("tgtg_scanner.scanner.Metrics")
+    mocker.patch("tgtg_scanner.tgtg.tgtg_client.TgtgClient.login", return_value=None)
+    mocker.patch("tgtg_scanner.tgtg.tgtg_client.TgtgClient._get_user_agent", return_value="test")
+    config = Config()
+    config.workers = 10
+    config.item_ids = [str(item_id) for item_id in range(100)]
+    config.tgtg.base_url = f"http://localhost:{tgtg_server.server_port}/"
+    config.tgtg.access_token = "access_token"
+    config.tgtg.refresh_token = "refresh_token"
+    config.tgtg.max_request_rate = 0
+    scanner = Scanner(config)
+    scanner.notifiers = MagicMock()
+    scanner._save_tokens = MagicMock()  # type: ignore[method-assign]
+
+    for key in [FAVORITES, *scanner.item_ids]:
+        scanner._schedule(key, 0)
+    scanner._dispatch()
+    deadline = monotonic() + 10
+    while len(scanner._queue) <= len(scanner.item_ids) and monotonic() < deadline:
+        sleep(0.001)
+    scanner.stop()
+
+    assert sorted(scanner.state) == sorted(scanner.item_ids)
+    # Each poll schedules its own next poll, no key is polled twice
+    assert sorted(key for _, key in scanner._queue) == sorted([FAVORITES, *scanner.item_ids])
@@ -0,0 +1,54 @@
+import datetime
+
+from tgtg_scanner.models.item import Item
+from tgtg_scanner.models.scheduler import MIN_RESTOCKS, AdaptiveScheduler
+
+
+def _item(tgtg_item: dict, items_available: int) -> Item:
+    return Item(tgtg_item | {"items_available": items_available})
+
+
+def test_scheduler_disabled(tgtg_item: dict):
+    scheduler = AdaptiveScheduler(sleep_time=60, enabled=False, requests_per_minute=1)
+    scheduler.observe(_item(tgtg_item, 1), 0)
+    for _ in range(100):
+        assert 54 <= scheduler.next_sleep(["774625"], 10) <= 66
+
+
+def test_scheduler_restock_hours(tgtg_item: dict):
+    scheduler = AdaptiveScheduler(sleep_time=60, enabled=True, min_sleep_time=20, max_sleep_time=300)
+    item_id = tgtg_item["item"]["item_id"]
+    restock_time = datetime.datetime(2024, 1, 1, 18, 5)
+    assert scheduler.item_sleep_time(item_id, restock_time) == 60
+
+    scheduler.observe(_item(tgtg_item, 0), None, restock_time)
+    scheduler.observe(_item(tgtg_item, 2), 0, restock_time)
+    assert scheduler.item_sleep_time(item_id, restock_time) == 20
+    assert scheduler.item_sleep_time(item_id, restock_time.replace(hour=19)) == 20
+    # not enough history to consider other hours cold
+    assert scheduler.item_sleep_time(item_id, restock_time.replace(hour=3)) == 60
+
+    for day in range(2, MIN_RESTOCKS + 1):
+        scheduler.observe(_item(tgtg_item, 2), 0, restock_time.replace(day=day))
+    assert scheduler.item_sleep_time(item_id, restock_time.replace(hour=3)) == 300
+    assert 18 <= scheduler.next_sleep([item_id], 1, restock_time) <= 22
+
+
+def test_scheduler_pickup_window(tgtg_item: dict):
+    scheduler = AdaptiveScheduler(sleep_time=60, enabled=True, min_sleep_time=20)
+    item_id = tgtg_item["item"]["item_id"]
+    scheduler.observe(_item(tgtg_item, 0), None)
+    pickup_start = Item._datetimeparse(tgtg_item["pickup_interval"]["start"])
+    assert scheduler.item_sleep_time(item_id, pickup_start - datetime.timedelta(minutes=30)) == 20
+    assert scheduler.item_sleep_time(item_id, pickup_start - datetime.timedelta(hours=2)) == 60
+
+
+def test_scheduler_request_budget(tgtg_item: dict):
+    scheduler = AdaptiveScheduler(sleep_time=60, enabled=True, min_sleep_time=20, requests_per_minute=10)
+    item_id = tgtg_item["item"]["item_id"]
+    restock_time = datetime.datetime(2024, 1, 1, 18, 5)
+    scheduler.observe(_item(tgtg_item, 2), 0, restock_time)
+    # 20 requests per scan at 10 requests per minute allow one scan every 120 seconds
+    assert 108 <= scheduler.next_sleep([item_id], 20, restock_time) <= 132
+    scheduler.requests_per_minute = 0
+    assert 18 <= scheduler.next_sleep([item_id], 20, restock_time) <= 22
@@ -0,0 +1,57 @@
+import html
+from functools import partial
+from unittest.mock import PropertyMock
+
+import pytest
+from pytest_mock.plugin import MockerFixture
+from telegram.helpers import escape_markdown
+
+from tgtg_scanner.errors import MaskConfigurationError
+from tgtg_scanner.models.item import Item
+from tgtg_scanner.models.template import Template, compile_template, escape_json
+
+
+def test_template_render(tgtg_item: dict):
+    item = Item(tgtg_item)
+    template = Template("${{display_name}} - ${{items_available}} left - ${{unknown}} - ${{display_name}}")
+    assert template.variables == ["display_name", "items_available", "unknown"]
+    assert template.render(item.field) == (
+        f"{item.display_name} - {item.items_available} left - ${{{{unknown}}}} - {item.display_name}"
+    )
+    assert Template("no variables").render(item.field) == "no variables"
+
+
+def test_template_resolves_variables_once(tgtg_item: dict, mocker: MockerFixture):
+    pickupdate = mocker.patch.object(Item, "pickupdate", new_callable=PropertyMock, return_value="today")
+    template = Template("${{pickupdate}} ${{pickupdate}}")
+    assert template.render(Item(tgtg_item).field) == "today today"
+    pickupdate.assert_called_once()
+
+
+@pytest.mark.parametrize(
+    "escape, expected",
+    [
+        (partial(escape_markdown, version=2), r"Bread & Co\. \(\*\)"),
+        (html.escape, "Bread &amp; Co. (*)"),
+        (escape_json, "Bread & Co. (*)"),
+    ],
+)
+def test_template_escape(escape, expected: str):
+    fields = {"store_name": "Bread & Co. (*)"}
+    assert Template("${{store_name}}").render(fields.__getitem__, escape) == expected
+    assert escape_json('say "hi"\n') == 'say \\"hi\\"\\n'
+
+
+def test_template_escapes_unknown_variables(tgtg_item: dict):
+    escape = partial(escape_markdown, version=2)
+    assert Template("${{unknown}}").render(Item(tgtg_item).field, escape) == r"$\{\{unknown\}\}"
+
+
+def test_compile_template_is_cached():
+    assert compile_template("${{display_name}}") is compile_template("${{display_name}}")
+
+
+def test_check_mask():
+    Item.check_mask("${{display_name}} ${{distance_walking}}")
+    with pytest.raises(MaskConfigurationError):
+        Item.check_mask("${{no_such_field}}")
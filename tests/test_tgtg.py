@@ -1,24 +1,38 @@
 import json
 import pathlib
 import re
+from concurrent.futures import ThreadPoolExecutor
 from os import getenv
+from unittest.mock import MagicMock
 from urllib.parse import urljoin
 
 import pytest
 import responses
 from pytest_mock.plugin import MockerFixture
+from tgtg_server import synthetic_item
 
+from tgtg_scanner.errors import TgtgAPIError, TgtgCaptchaError
 from tgtg_scanner.models import Config
+from tgtg_scanner.tgtg.apk_version import APK_VERSION_FILE, ApkVersionCache
+from tgtg_scanner.tgtg.json_decoder import loads
+from tgtg_scanner.tgtg.rate_limiter import MIN_REQUEST_RATE, RateLimiter
 from tgtg_scanner.tgtg.tgtg_client import (
+    ACTIVE_ORDER_ENDPOINT,
     API_ITEM_ENDPOINT,
     AUTH_BY_EMAIL_ENDPOINT,
     AUTH_POLLING_ENDPOINT,
     BASE_URL,
+    CAPTCHA_COOLDOWN,
+    CAPTCHA_MAX_WAIT,
+    CAPTCHA_MIN_REQUEST_RATE,
+    CAPTCHA_RETRY_DELAY,
     FAVORITE_ITEM_ENDPOINT,
+    MAX_CAPTCHA_ERRORS,
     REFRESH_ENDPOINT,
     USER_AGENTS,
     TgtgClient,
 )
+from tgtg_scanner.tgtg.token_manager import TOKEN_REFRESH_RATIO, TokenManager
 
 
 def test_get_latest_apk_version():
@@ -38,6 +52,61 @@ def test_get_user_agent(mocker: MockerFixture):
     assert user_agent in [agent.format(apk_version) for agent in USER_AGENTS]
 
 
+def test_apk_version_cache(tmp_path: pathlib.Path):
+    fetch = MagicMock(return_value="24.1.0")
+    cache = ApkVersionCache(fetch, "1.0.0", str(tmp_path), ttl=100, max_age=1000)
+    # cold start fetches synchronously and persists the version
+    assert cache.get() == "24.1.0"
+    assert json.loads((tmp_path / APK_VERSION_FILE).read_text())["version"] == "24.1.0"
+
+    # the persisted version is used without fetching
+    fetch.return_value = "24.2.0"
+    cache = ApkVersionCache(fetch, "1.0.0", str(tmp_path), ttl=100, max_age=1000)
+    assert cache.get() == "24.1.0"
+    assert fetch.call_count == 1
+
+    # expired versions are returned while refreshing in the background
+    cache.updated -= 200
+    assert cache.get() == "24.1.0"
+    assert cache._refresh_thread is not None
+    cache._refresh_thread.join()
+    assert cache.get() == "24.2.0"
+
+    # versions beyond the staleness limit are refreshed synchronously
+    fetch.return_value = "24.3.0"
+    cache.updated -= 2000
+    assert cache.get() == "24.3.0"
+
+
+def test_apk_version_cache_fetch_error():
+    fetch = MagicMock(side_effect=TgtgAPIError("Failed"))
+    cache = ApkVersionCache(fetch, "1.0.0", ttl=100, max_age=1000)
+    assert cache.get() == "1.0.0"
+    # the next call does not block on another request
+    cache.refresh_in_background = MagicMock()  # type: ignore[method-assign]
+    assert cache.get() == "1.0.0"
+    cache.refresh_in_background.assert_called_once()
+    assert fetch.call_count == 1
+
+
+def test_apk_version_refresh_updates_user_agent(mocker: MockerFixture):
+    latest = mocker.patch(
+        "tgtg_scanner.tgtg.tgtg_client.TgtgClient.get_latest_apk_version",
+        return_value="22.11.11",
+    )
+    client = TgtgClient(access_token="access_token", refresh_token="refresh_token")
+    client.session = client._create_session()
+    assert "22.11.11" in client.session.headers["user-agent"]
+
+    latest.return_value = "24.1.0"
+    client.apk_version.refresh_in_background()
+    assert client.apk_version._refresh_thread is not None
+    client.apk_version._refresh_thread.join()
+    # the running session continues with the new version
+    assert client.user_agent in [agent.format("24.1.0") for agent in USER_AGENTS]
+    assert client.session.headers["user-agent"] == client.user_agent
+
+
 @responses.activate
 def test_tgtg_login_with_mail(mocker: MockerFixture):
     mocker.patch(
@@ -74,7 +143,9 @@ def test_tgtg_login_with_mail(mocker: MockerFixture):
     client.login()
     assert client.access_token == poll_response_data.get("access_token")
     assert client.refresh_token == poll_response_data.get("refresh_token")
-    assert json.loads(responses.calls[1].request.body) == {
+    body = responses.calls[1].request.body
+    assert body is not None
+    assert json.loads(body) == {
         "device_type": client.device_type,
         "email": client.email,
         "request_polling_id": auth_response_data.get("polling_id"),
@@ -108,6 +179,59 @@ def test_tgtg_login_with_token(mocker: MockerFixture):
     assert client.refresh_token == response_data.get("refresh_token")
 
 
+@responses.activate
+def test_tgtg_login_refreshes_once(mocker: MockerFixture):
+    client = TgtgClient(
+        access_token="old_access_token",
+        refresh_token="old_refresh_token",
+        user_agent="test",
+        access_token_lifetime=14400,
+    )
+    responses.add(
+        responses.POST,
+        urljoin(BASE_URL, REFRESH_ENDPOINT),
+        json={"access_token": "new_access_token", "access_token_ttl_seconds": 3600, "refresh_token": "new_refresh_token"},
+        status=200,
+    )
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda _: client.login(), range(8)))
+    assert len(responses.calls) == 1
+    assert client.access_token_ttl == 3600
+    # the token is refreshed ahead of the real expiry
+    assert client.token_manager._timer is not None
+    assert client.token_manager._timer.interval == 3600 * TOKEN_REFRESH_RATIO
+    client.token_manager.stop()
+
+
+def test_token_manager_background_refresh():
+    refresh = MagicMock(return_value=None)
+    token_manager = TokenManager(refresh, lifetime=100)
+    token_manager.ensure()
+    token_manager.ensure()
+    assert refresh.call_count == 1
+    assert token_manager._timer is not None
+    assert token_manager._timer.interval == 100
+
+    token_manager._background_refresh()
+    assert refresh.call_count == 2
+    assert token_manager.valid
+
+    # failed background refreshes are retried inline by the next caller
+    refresh.side_effect = TgtgAPIError("Failed")
+    token_manager._background_refresh()
+    assert not token_manager.valid
+    refresh.side_effect = None
+    token_manager.ensure()
+    assert refresh.call_count == 4
+    token_manager.stop()
+
+
+def test_loads(tgtg_item: dict):
+    document = json.dumps({"items": [tgtg_item, {"item": {"item_id": "\u00fc"}}], "total": 1.5})
+    assert loads(document) == json.loads(document)
+    assert loads(document.encode("utf-8")) == json.loads(document)
+
+
 @responses.activate
 def test_tgtg_get_items(mocker: MockerFixture, tgtg_item: dict):
     mocker.patch(
@@ -173,7 +297,208 @@ def test_tgtg_set_favorite(mocker: MockerFixture):
         refresh_token="refresh_token",
     )
     client.set_favorite(item_id, True)
-    assert json.loads(responses.calls[0].request.body) == {"is_favorite": True}
+    body = responses.calls[0].request.body
+    assert body is not None
+    assert json.loads(body) == {"is_favorite": True}
+
+
+@responses.activate
+def test_tgtg_get_active_orders(mocker: MockerFixture):
+    mocker.patch(
+        "tgtg_scanner.tgtg.tgtg_client.TgtgClient.get_latest_apk_version",
+        return_value="22.11.11",
+    )
+    mocker.patch("tgtg_scanner.tgtg.tgtg_client.TgtgClient.login", return_value=None)
+    orders = [{"order_id": "1", "state": "RESERVED"}, {"order_id": "2", "state": "PAID"}]
+    responses.add(
+        responses.POST,
+        urljoin(BASE_URL, ACTIVE_ORDER_ENDPOINT),
+        json.dumps({"orders": orders}),
+        status=200,
+    )
+    client = TgtgClient(
+        email="test@example.com",
+        access_token="access_token",
+        refresh_token="refresh_token",
+    )
+    assert client.get_active_orders() == orders
+    assert len(responses.calls) == 1
+
+
+def test_tgtg_get_favorites_parallel_pages(mocker: MockerFixture, tgtg_server):
+    mocker.patch("tgtg_scanner.tgtg.tgtg_client.TgtgClient.login", return_value=None)
+    handler = tgtg_server.RequestHandlerClass
+    handler.favorites = [synthetic_item(i) for i in range(450)]
+    client = TgtgClient(
+        base_url=f"http://localhost:{tgtg_server.server_port}/",
+        access_token="access_token",
+        refresh_token="refresh_token",
+        user_agent="test",
+        max_workers=5,
+    )
+
+    # first call probes page by page
+    favorites = client.get_favorites()
+    assert [item["item"]["item_id"] for item in favorites] == [str(i) for i in range(450)]
+    assert handler.favorites_requests == [1, 2, 3, 4, 5]
+    assert client.favorites_page_count == 5
+
+    # known pages are requested at once
+    handler.favorites_requests.clear()
+    assert len(client.get_favorites()) == 450
+    assert sorted(handler.favorites_requests) == [1, 2, 3, 4, 5]
+
+    # a full last page triggers probing of further pages
+    handler.favorites = [synthetic_item(i) for i in range(520)]
+    handler.favorites_requests.clear()
+    assert len(client.get_favorites()) == 520
+    assert sorted(handler.favorites_requests) == [1, 2, 3, 4, 5, 6]
+    assert client.favorites_page_count == 6
+
+    # surplus pages are dropped when favorites shrink
+    handler.favorites = [synthetic_item(i) for i in range(150)]
+    favorites = client.get_favorites()
+    assert [item["item"]["item_id"] for item in favorites] == [str(i) for i in range(150)]
+    assert client.favorites_page_count == 2
+
+
+class FakeClock:
+    """Replaces the time module of the client, sleeping advances the monotonic clock."""
+
+    def __init__(self) -> None:
+        self.now = 0.0
+        self.sleeps: list[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(mocker: MockerFixture) -> FakeClock:
+    clock = FakeClock()
+    mocker.patch("tgtg_scanner.tgtg.rate_limiter.time", clock)
+    mocker.patch("tgtg_scanner.tgtg.tgtg_client.time", clock)
+    return clock
+
+
+@responses.activate
+def test_tgtg_captcha_retry(mocker: MockerFixture, tgtg_item: dict, clock: FakeClock):
+    mocker.patch("tgtg_scanner.tgtg.tgtg_client.TgtgClient.login", return_value=None)
+    item_id = tgtg_item.get("item", {}).get("item_id")
+    url = urljoin(BASE_URL, API_ITEM_ENDPOINT + item_id)
+    responses.add(responses.POST, url, status=403)
+    responses.add(responses.POST, url, status=403)
+    responses.add(responses.POST, url, json=tgtg_item, status=200)
+    client = TgtgClient(
+        access_token="access_token",
+        refresh_token="refresh_token",
+        user_agent="test",
+        max_request_rate=60,
+    )
+
+    assert client.get_item(item_id) == tgtg_item
+    assert len(responses.calls) == 3
+    assert client.captcha_error_count == 0
+    # the rate was halved twice and each retry waited for a new token at the lowered rate
+    assert client.rate_limiter.rate == pytest.approx(15 + 0.6)
+    assert clock.now == pytest.approx(60 / 30 + 60 / 15)
+    assert all(seconds >= CAPTCHA_RETRY_DELAY for seconds in clock.sleeps[::2])
+
+
+@responses.activate
+def test_tgtg_captcha_cooldown(mocker: MockerFixture, tgtg_item: dict):
+    mocker.patch("tgtg_scanner.tgtg.tgtg_client.TgtgClient.login", return_value=None)
+    mocker.patch("tgtg_scanner.tgtg.rate_limiter.time.sleep", return_value=None)
+    item_id = tgtg_item.get("item", {}).get("item_id")
+    url = urljoin(BASE_URL, API_ITEM_ENDPOINT + item_id)
+    responses.add(responses.POST, url, status=403)
+    client = TgtgClient(
+        access_token="access_token",
+        refresh_token="refresh_token",
+        user_agent="test",
+        max_request_rate=0,
+    )
+
+    sleep = mocker.patch("tgtg_scanner.tgtg.tgtg_client.time.sleep", return_value=None)
+    with pytest.raises(TgtgCaptchaError):
+        client.get_item(item_id)
+    assert len(responses.calls) == MAX_CAPTCHA_ERRORS
+    # retries keep a minimum delay without rate limiting
+    assert sleep.call_count == MAX_CAPTCHA_ERRORS
+    assert client.cooldown_remaining == pytest.approx(CAPTCHA_COOLDOWN, abs=5)
+
+    # requests fail fast during the cooldown
+    with pytest.raises(TgtgCaptchaError):
+        client.get_item(item_id)
+    assert len(responses.calls) == MAX_CAPTCHA_ERRORS
+
+    # and resume once it ended
+    client.cooldown_until -= CAPTCHA_COOLDOWN
+    responses.replace(responses.POST, url, json=tgtg_item, status=200)
+    assert client.get_item(item_id) == tgtg_item
+    assert client.cooldown_until == 0
+
+
+@responses.activate
+def test_tgtg_captcha_reaches_cooldown(mocker: MockerFixture, tgtg_item: dict, clock: FakeClock):
+    mocker.patch("tgtg_scanner.tgtg.tgtg_client.TgtgClient.login", return_value=None)
+    item_id = tgtg_item.get("item", {}).get("item_id")
+    url = urljoin(BASE_URL, API_ITEM_ENDPOINT + item_id)
+    responses.add(responses.POST, url, status=403)
+    client = TgtgClient(
+        access_token="access_token",
+        refresh_token="refresh_token",
+        user_agent="test",
+        max_request_rate=300,
+    )
+
+    # the lowered rate never blocks a retry longer than CAPTCHA_MAX_WAIT,
+    # so repeated captcha errors end in the cooldown
+    with pytest.raises(TgtgCaptchaError):
+        client.get_item(item_id)
+    assert len(responses.calls) == MAX_CAPTCHA_ERRORS
+    assert client.cooldown_remaining == pytest.approx(CAPTCHA_COOLDOWN, abs=CAPTCHA_RETRY_DELAY)
+    assert client.rate_limiter.rate == CAPTCHA_MIN_REQUEST_RATE
+    assert max(clock.sleeps) <= CAPTCHA_MAX_WAIT
+
+    # a caller fails fast when another caller reserved the next token of the lowered rate
+    client.cooldown_until = 0.0
+    client.captcha_error_count = 1
+    client.rate_limiter.decrease()
+    assert client.rate_limiter.reserve(CAPTCHA_MAX_WAIT) == CAPTCHA_MAX_WAIT
+    with pytest.raises(TgtgCaptchaError):
+        client.get_item(item_id)
+    assert len(responses.calls) == MAX_CAPTCHA_ERRORS
+
+
+def test_rate_limiter(mocker: MockerFixture):
+    sleep = mocker.patch("tgtg_scanner.tgtg.rate_limiter.time.sleep", return_value=None)
+    rate_limiter = RateLimiter(max_rate=60, burst=2)
+    rate_limiter.acquire()
+    rate_limiter.acquire()
+    sleep.assert_not_called()
+    rate_limiter.acquire()
+    assert sleep.call_args.args[0] == pytest.approx(1, rel=0.01)
+    # no token is taken when it is not available in time
+    assert not rate_limiter.acquire(timeout=1.5)
+    assert rate_limiter.tokens == pytest.approx(-1, abs=0.01)
+
+    for _ in range(10):
+        rate_limiter.decrease()
+    assert rate_limiter.rate == MIN_REQUEST_RATE
+    for _ in range(200):
+        rate_limiter.increase()
+    assert rate_limiter.rate == 60
+
+    sleep.reset_mock()
+    disabled = RateLimiter(max_rate=0)
+    for _ in range(100):
+        disabled.acquire()
+    sleep.assert_not_called()
 
 
 @pytest.mark.tgtg_api
@@ -2,7 +2,7 @@ import argparse
 import json
 import logging
 import random
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 from urllib.parse import urljoin
 
 import requests
@@ -10,7 +10,27 @@ import requests
 from tgtg_scanner.tgtg.tgtg_client import API_ITEM_ENDPOINT, BASE_URL
 
 
+def synthetic_item(index: int) -> dict:
+    """Returns a minimal item as returned by the TGTG API."""
+    return {
+        "display_name": f"Store {index}",
+        "items_available": random.randint(0, 3),
+        "item": {
+            "item_id": str(index),
+            "item_price": {"code": "EUR", "decimals": 2, "minor_units": 300},
+            "item_value": {"code": "EUR", "decimals": 2, "minor_units": 900},
+        },
+        "pickup_interval": {"end": "2021-01-04T19:30:00Z", "start": "2021-01-04T19:00:00Z"},
+        "store": {"store_name": f"Store {index}"},
+    }
+
+
 class RequestHandler(BaseHTTPRequestHandler):
+    # Serve these favorites and synthetic items instead of proxying item requests to the TGTG API
+    favorites: list[dict] | None = None
+    # Pages of requested favorites
+    favorites_requests: list[int] = []
+
     def do_GET(self):
         logging.info("GET request,\nPath: %s\nHeaders:\n%s\n", str(self.path), str(self.headers))
         self.send_response(200)
@@ -30,6 +50,13 @@ class RequestHandler(BaseHTTPRequestHandler):
         )
 
         path = self.path[1:]
+        if self.favorites is not None and path == API_ITEM_ENDPOINT:
+            self._send_favorites(json.loads(post_data))
+            return
+        if self.favorites is not None and path.startswith(API_ITEM_ENDPOINT):
+            self._send_json(synthetic_item(int(path.rsplit("/", 1)[-1])))
+            return
+
         headers = self.headers
         headers["Host"] = "apptoogoodtogo.com"
         url = urljoin(BASE_URL, path)
@@ -52,10 +79,27 @@ class RequestHandler(BaseHTTPRequestHandler):
         self.end_headers()
         self.wfile.write(response_data)
 
+    def _send_favorites(self, data: dict) -> None:
+        page, page_size = data.get("page", 1), data.get("page_size", 20)
+        self.favorites_requests.append(page)
+        items = (self.favorites or [])[(page - 1) * page_size : page * page_size]
+        self._send_json({"items": items})
+
+    def _send_json(self, data: dict) -> None:
+        self.send_response(200)
+        self.send_header("Content-type", "application/json")
+        self.end_headers()
+        self.wfile.write(json.dumps(data).encode("utf-8"))
+
+
+def create_server(port: int = 8080, favorites: int | None = None) -> ThreadingHTTPServer:
+    if favorites is not None:
+        RequestHandler.favorites = [synthetic_item(i) for i in range(favorites)]
+    return ThreadingHTTPServer(("", port), RequestHandler)
+
 
-def run_server(port: int = 8080):
-    server_address = ("", port)
-    httpd = HTTPServer(server_address, RequestHandler)
+def run_server(port: int = 8080, favorites: int | None = None):
+    httpd = create_server(port, favorites)
     logging.info("Starting httpd...")
     try:
         httpd.serve_forever()
@@ -69,9 +113,10 @@ def main():
     parser = argparse.ArgumentParser(description="TGTG API test server")
     parser.add_argument("-d", "--debug", action="store_true", help="activate debugging mode")
     parser.add_argument("-p", "--port", type=int, default=8080)
+    parser.add_argument("-f", "--favorites", type=int, default=None, help="serve a number of synthetic favorites")
     args = parser.parse_args()
     logging.basicConfig(level=logging.DEBUG if args.debug else logging.INFO)
-    run_server(args.port)
+    run_server(args.port, args.favorites)
 
 
 if __name__ == "__main__":
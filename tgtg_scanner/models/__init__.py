@@ -3,7 +3,10 @@
 from tgtg_scanner.models.config import Config
 from tgtg_scanner.models.cron import Cron
 from tgtg_scanner.models.favorites import Favorites
-from tgtg_scanner.models.item import Item
+from tgtg_scanner.models.image_cache import ImageCache
+from tgtg_scanner.models.item import Item, ItemBatch, ItemSnapshot
 from tgtg_scanner.models.location import Location
 from tgtg_scanner.models.metrics import Metrics
 from tgtg_scanner.models.reservations import Reservations
+from tgtg_scanner.models.scheduler import AdaptiveScheduler
+from tgtg_scanner.models.state_snapshot import StateSnapshot
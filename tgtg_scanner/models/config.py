@@ -12,8 +12,9 @@ from typing import IO, Any
 
 import humanize
 
-from tgtg_scanner.errors import ConfigurationError
+from tgtg_scanner.errors import ConfigurationError, MaskConfigurationError
 from tgtg_scanner.models.cron import Cron
+from tgtg_scanner.models.item import ItemBatch
 from tgtg_scanner.tgtg.tgtg_client import BASE_URL
 
 log = logging.getLogger("tgtg")
@@ -26,6 +27,8 @@ CONFIG_FILE_HEADER = """## TGTG Scanner Configuration
 
 """
 
+QUEUE_POLICIES = ("drop_oldest", "drop_stale", "block")
+
 DEPRECATION_NOTICE = "{} is deprecated and will be removed in a future release. Please use {} instead."
 
 
@@ -133,6 +136,56 @@ class NotifierConfig(BaseConfig):
 
     enabled: bool = False
     cron: Cron = field(default_factory=Cron)
+    batch_window: int = 0  # Milliseconds, 0 disables batching
+    batch_size: int = 10
+    batch_body: str | None = None
+    queue_size: int = 100  # 0 for unbounded
+    queue_policy: str = "drop_oldest"
+    queue_max_age: int = 0  # Seconds, 0 disables
+    retries: int = 3
+    retry_delay: int = 5  # Seconds, doubled for each retry
+
+    def _ini_get_batch(self, parser: configparser.ConfigParser, section: str):
+        self._ini_get_int(parser, section, "BatchWindow", "batch_window")
+        self._ini_get_int(parser, section, "BatchSize", "batch_size")
+        self._ini_get(parser, section, "BatchBody", "batch_body")
+        self._check_batch_body(f"{section}.BatchBody")
+
+    def _env_get_batch(self, prefix: str):
+        self._env_get_int(f"{prefix}_BATCH_WINDOW", "batch_window")
+        self._env_get_int(f"{prefix}_BATCH_SIZE", "batch_size")
+        self._env_get(f"{prefix}_BATCH_BODY", "batch_body")
+        self._check_batch_body(f"{prefix}_BATCH_BODY")
+
+    def _check_batch_body(self, option: str):
+        if not self.batch_body:
+            return
+        try:
+            ItemBatch.check_mask(self.batch_body)
+        except MaskConfigurationError as exc:
+            raise ConfigurationError(f"Invalid batch body for {option} - {exc.message}") from exc
+
+    def _ini_get_queue(self, parser: configparser.ConfigParser, section: str):
+        self._ini_get_int(parser, section, "QueueSize", "queue_size")
+        self._ini_get(parser, section, "QueuePolicy", "queue_policy")
+        self._ini_get_int(parser, section, "QueueMaxAge", "queue_max_age")
+        if self.queue_policy not in QUEUE_POLICIES:
+            raise ConfigurationError(f"Invalid queue policy for {section}.QueuePolicy - {self.queue_policy}")
+
+    def _env_get_queue(self, prefix: str):
+        self._env_get_int(f"{prefix}_QUEUE_SIZE", "queue_size")
+        self._env_get(f"{prefix}_QUEUE_POLICY", "queue_policy")
+        self._env_get_int(f"{prefix}_QUEUE_MAX_AGE", "queue_max_age")
+        if self.queue_policy not in QUEUE_POLICIES:
+            raise ConfigurationError(f"Invalid queue policy for {prefix}_QUEUE_POLICY - {self.queue_policy}")
+
+    def _ini_get_retry(self, parser: configparser.ConfigParser, section: str):
+        self._ini_get_int(parser, section, "Retries", "retries")
+        self._ini_get_int(parser, section, "RetryDelay", "retry_delay")
+
+    def _env_get_retry(self, prefix: str):
+        self._env_get_int(f"{prefix}_RETRIES", "retries")
+        self._env_get_int(f"{prefix}_RETRY_DELAY", "retry_delay")
 
 
 @dataclass
@@ -146,16 +199,22 @@ class AppriseConfig(NotifierConfig):
     def _read_ini(self, parser: configparser.ConfigParser):
         self._ini_get_boolean(parser, "APPRISE", "Enabled", "enabled")
         self._ini_get_cron(parser, "APPRISE", "Cron", "cron")
+        self._ini_get_queue(parser, "APPRISE")
+        self._ini_get_retry(parser, "APPRISE")
         self._ini_get(parser, "APPRISE", "URL", "url")
         self._ini_get(parser, "APPRISE", "Title", "title")
         self._ini_get(parser, "APPRISE", "Body", "body")
+        self._ini_get_batch(parser, "APPRISE")
 
     def _read_env(self):
         self._env_get_boolean("APPRISE", "enabled")
         self._env_get_cron("APPRISE_CRON", "cron")
+        self._env_get_queue("APPRISE")
+        self._env_get_retry("APPRISE")
         self._env_get("APPRISE_URL", "url")
         self._env_get("APPRISE_TITLE", "title")
         self._env_get("APPRISE_BODY", "body")
+        self._env_get_batch("APPRISE")
 
 
 @dataclass
@@ -175,6 +234,8 @@ class TelegramConfig(NotifierConfig):
     def _read_ini(self, parser: configparser.ConfigParser):
         self._ini_get_boolean(parser, "TELEGRAM", "Enabled", "enabled")
         self._ini_get_cron(parser, "TELEGRAM", "Cron", "cron")
+        self._ini_get_queue(parser, "TELEGRAM")
+        self._ini_get_retry(parser, "TELEGRAM")
         self._ini_get(parser, "TELEGRAM", "Token", "token")
         if parser.has_option("TELEGRAM", "chat_ids"):
             log.warning(DEPRECATION_NOTICE.format("[TELEGRAM] chat_ids", "ChatIDs"))
@@ -184,17 +245,21 @@ class TelegramConfig(NotifierConfig):
         self._ini_get_boolean(parser, "TELEGRAM", "OnlyReservations", "only_reservations")
         self._ini_get_int(parser, "TELEGRAM", "Timeout", "timeout")
         self._ini_get(parser, "TELEGRAM", "Body", "body")
+        self._ini_get_batch(parser, "TELEGRAM")
         self._ini_get(parser, "TELEGRAM", "Image", "image")
 
     def _read_env(self):
         self._env_get_boolean("TELEGRAM", "enabled")
         self._env_get_cron("TELEGRAM_CRON", "cron")
+        self._env_get_queue("TELEGRAM")
+        self._env_get_retry("TELEGRAM")
         self._env_get("TELEGRAM_TOKEN", "token")
         self._env_get_list("TELEGRAM_CHAT_IDS", "chat_ids")
         self._env_get_boolean("TELEGRAM_DISABLE_COMMANDS", "disable_commands")
         self._env_get_boolean("TELEGRAM_ONLY_RESERVATIONS", "only_reservations")
         self._env_get_int("TELEGRAM_TIMEOUT", "timeout")
         self._env_get("TELEGRAM_BODY", "body")
+        self._env_get_batch("TELEGRAM")
         self._env_get("TELEGRAM_IMAGE", "image")
 
 
@@ -212,6 +277,8 @@ class PushSaferConfig(NotifierConfig):
     def _read_ini(self, parser: configparser.ConfigParser):
         self._ini_get_boolean(parser, "PUSHSAFER", "Enabled", "enabled")
         self._ini_get_cron(parser, "PUSHSAFER", "Cron", "cron")
+        self._ini_get_queue(parser, "PUSHSAFER")
+        self._ini_get_retry(parser, "PUSHSAFER")
         self._ini_get(parser, "PUSHSAFER", "Key", "key")
         self._ini_get_list(parser, "PUSHSAFER", "DeviceID", "device_ids")  # Legacy support
         self._ini_get_list(parser, "PUSHSAFER", "DeviceIDs", "device_ids")
@@ -219,6 +286,8 @@ class PushSaferConfig(NotifierConfig):
     def _read_env(self):
         self._env_get_boolean("PUSHSAFER", "enabled")
         self._env_get_cron("PUSHSAFER_CRON", "cron")
+        self._env_get_queue("PUSHSAFER")
+        self._env_get_retry("PUSHSAFER")
         self._env_get("PUSHSAFER_KEY", "key")
         self._env_get_list("PUSHSAFER_DEVICE_ID", "device_ids")
         self._env_get_list("PUSHSAFER_DEVICE_IDS", "device_ids")
@@ -233,12 +302,18 @@ class ConsoleConfig(NotifierConfig):
     def _read_ini(self, parser: configparser.ConfigParser):
         self._ini_get_boolean(parser, "CONSOLE", "Enabled", "enabled")
         self._ini_get_cron(parser, "CONSOLE", "Cron", "cron")
+        self._ini_get_queue(parser, "CONSOLE")
+        self._ini_get_retry(parser, "CONSOLE")
         self._ini_get(parser, "CONSOLE", "Body", "body")
+        self._ini_get_batch(parser, "CONSOLE")
 
     def _read_env(self):
         self._env_get_boolean("CONSOLE", "enabled")
         self._env_get_cron("CONSOLE_CRON", "cron")
+        self._env_get_queue("CONSOLE")
+        self._env_get_retry("CONSOLE")
         self._env_get("CONSOLE_BODY", "body")
+        self._env_get_batch("CONSOLE")
 
 
 @dataclass
@@ -261,6 +336,8 @@ class SMTPConfig(NotifierConfig):
     def _read_ini(self, parser: configparser.ConfigParser):
         self._ini_get_boolean(parser, "SMTP", "Enabled", "enabled")
         self._ini_get_cron(parser, "SMTP", "Cron", "cron")
+        self._ini_get_queue(parser, "SMTP")
+        self._ini_get_retry(parser, "SMTP")
         self._ini_get(parser, "SMTP", "Host", "host")
         self._ini_get_int(parser, "SMTP", "Port", "port")
         self._ini_get(parser, "SMTP", "Username", "username")
@@ -276,10 +353,13 @@ class SMTPConfig(NotifierConfig):
         self._ini_get(parser, "SMTP", "RecipientsPerItem", "recipients_per_item")
         self._ini_get(parser, "SMTP", "Subject", "subject")
         self._ini_get(parser, "SMTP", "Body", "body")
+        self._ini_get_batch(parser, "SMTP")
 
     def _read_env(self):
         self._env_get_boolean("SMTP", "enabled")
         self._env_get_cron("SMTP_CRON", "cron")
+        self._env_get_queue("SMTP")
+        self._env_get_retry("SMTP")
         self._env_get("SMTP_HOST", "host")
         self._env_get_int("SMTP_PORT", "port")
         self._env_get("SMTP_USERNAME", "username")
@@ -295,6 +375,7 @@ class SMTPConfig(NotifierConfig):
         self._env_get("SMTP_RECIPIENTS_PER_ITEM", "recipients_per_item")
         self._env_get("SMTP_SUBJECT", "subject")
         self._env_get("SMTP_BODY", "body")
+        self._env_get_batch("SMTP")
 
 
 @dataclass
@@ -309,6 +390,8 @@ class IFTTTConfig(NotifierConfig):
     def _read_ini(self, parser: configparser.ConfigParser):
         self._ini_get_boolean(parser, "IFTTT", "Enabled", "enabled")
         self._ini_get_cron(parser, "IFTTT", "Cron", "cron")
+        self._ini_get_queue(parser, "IFTTT")
+        self._ini_get_retry(parser, "IFTTT")
         self._ini_get(parser, "IFTTT", "Event", "event")
         self._ini_get(parser, "IFTTT", "Key", "key")
         self._ini_get(parser, "IFTTT", "Body", "body")
@@ -317,6 +400,8 @@ class IFTTTConfig(NotifierConfig):
     def _read_env(self):
         self._env_get_boolean("IFTTT", "enabled")
         self._env_get_cron("IFTTT_CRON", "cron")
+        self._env_get_queue("IFTTT")
+        self._env_get_retry("IFTTT")
         self._env_get("IFTTT_EVENT", "event")
         self._env_get("IFTTT_KEY", "key")
         self._env_get("IFTTT_BODY", "body")
@@ -343,11 +428,14 @@ class NtfyConfig(NotifierConfig):
     def _read_ini(self, parser: configparser.ConfigParser):
         self._ini_get_boolean(parser, "NTFY", "Enabled", "enabled")
         self._ini_get_cron(parser, "NTFY", "Cron", "cron")
+        self._ini_get_queue(parser, "NTFY")
+        self._ini_get_retry(parser, "NTFY")
         self._ini_get(parser, "NTFY", "Server", "server")
         self._ini_get(parser, "NTFY", "Topic", "topic")
         self._ini_get(parser, "NTFY", "Title", "title")
         self._ini_get(parser, "NTFY", "Message", "message")
         self._ini_get(parser, "NTFY", "Body", "body")
+        self._ini_get_batch(parser, "NTFY")
         self._ini_get(parser, "NTFY", "Priority", "priority")
         self._ini_get(parser, "NTFY", "Tags", "tags")
         self._ini_get(parser, "NTFY", "Click", "click")
@@ -359,11 +447,14 @@ class NtfyConfig(NotifierConfig):
     def _read_env(self):
         self._env_get_boolean("NTFY", "enabled")
         self._env_get_cron("NTFY_CRON", "cron")
+        self._env_get_queue("NTFY")
+        self._env_get_retry("NTFY")
         self._env_get("NTFY_SERVER", "server")
         self._env_get("NTFY_TOPIC", "topic")
         self._env_get("NTFY_TITLE", "title")
         self._env_get("NTFY_MESSAGE", "message")
         self._env_get("NTFY_BODY", "body")
+        self._env_get_batch("NTFY")
         self._env_get("NTFY_PRIORITY", "priority")
         self._env_get("NTFY_TAGS", "tags")
         self._env_get("NTFY_CLICK", "click")
@@ -389,10 +480,13 @@ class WebhookConfig(NotifierConfig):
     def _read_ini(self, parser: configparser.ConfigParser):
         self._ini_get_boolean(parser, "WEBHOOK", "Enabled", "enabled")
         self._ini_get_cron(parser, "WEBHOOK", "Cron", "cron")
+        self._ini_get_queue(parser, "WEBHOOK")
+        self._ini_get_retry(parser, "WEBHOOK")
         self._ini_get(parser, "WEBHOOK", "URL", "url")
         self._ini_get(parser, "WEBHOOK", "Method", "method")
         self._ini_get_dict(parser, "WEBHOOK", "Headers", "headers")
         self._ini_get(parser, "WEBHOOK", "Body", "body")
+        self._ini_get_batch(parser, "WEBHOOK")
         self._ini_get(parser, "WEBHOOK", "Type", "type")
         self._ini_get(parser, "WEBHOOK", "Username", "username")
         self._ini_get(parser, "WEBHOOK", "Password", "password")
@@ -401,10 +495,13 @@ class WebhookConfig(NotifierConfig):
     def _read_env(self):
         self._env_get_boolean("WEBHOOK", "enabled")
         self._env_get_cron("WEBHOOK_CRON", "cron")
+        self._env_get_queue("WEBHOOK")
+        self._env_get_retry("WEBHOOK")
         self._env_get("WEBHOOK_URL", "url")
         self._env_get("WEBHOOK_METHOD", "method")
         self._env_get_dict("WEBHOOK_HEADERS", "headers")
         self._env_get("WEBHOOK_BODY", "body")
+        self._env_get_batch("WEBHOOK")
         self._env_get("WEBHOOK_TYPE", "type")
         self._env_get("WEBHOOK_USERNAME", "username")
         self._env_get("WEBHOOK_PASSWORD", "password")
@@ -420,11 +517,15 @@ class ScriptConfig(NotifierConfig):
     def _read_ini(self, parser: configparser.ConfigParser):
         self._ini_get_boolean(parser, "SCRIPT", "Enabled", "enabled")
         self._ini_get_cron(parser, "SCRIPT", "Cron", "cron")
+        self._ini_get_queue(parser, "SCRIPT")
+        self._ini_get_retry(parser, "SCRIPT")
         self._ini_get(parser, "SCRIPT", "Command", "command")
 
     def _read_env(self):
         self._env_get_boolean("SCRIPT", "enabled")
         self._env_get_cron("SCRIPT_CRON", "cron")
+        self._env_get_queue("SCRIPT")
+        self._env_get_retry("SCRIPT")
         self._env_get("SCRIPT_COMMAND", "command")
 
 
@@ -433,7 +534,7 @@ class DiscordConfig(NotifierConfig):
     """Discord configuration."""
 
     enabled: bool = False
-    prefix: str | None = "!"
+    prefix: str = "!"
     token: str | None = None
     channel: int = 0
     body: str = (
@@ -447,8 +548,11 @@ class DiscordConfig(NotifierConfig):
         self._ini_get(parser, "DISCORD", "Token", "token")
         self._ini_get_int(parser, "DISCORD", "Channel", "channel")
         self._ini_get(parser, "DISCORD", "Body", "body")
+        self._ini_get_batch(parser, "DISCORD")
         self._ini_get_boolean(parser, "DISCORD", "DisableCommands", "disable_commands")
         self._ini_get_cron(parser, "DISCORD", "Cron", "cron")
+        self._ini_get_queue(parser, "DISCORD")
+        self._ini_get_retry(parser, "DISCORD")
 
     def _read_env(self):
         self._env_get_boolean("DISCORD", "enabled")
@@ -456,8 +560,11 @@ class DiscordConfig(NotifierConfig):
         self._env_get("DISCORD_TOKEN", "token")
         self._env_get_int("DISCORD_CHANNEL", "channel")
         self._env_get("DISCORD_BODY", "body")
+        self._env_get_batch("DISCORD")
         self._env_get_boolean("DISCORD_DISABLE_COMMANDS", "disable_commands")
         self._env_get_cron("DISCORD_CRON", "cron")
+        self._env_get_queue("DISCORD")
+        self._env_get_retry("DISCORD")
 
 
 @dataclass
@@ -472,6 +579,8 @@ class TgtgConfig(BaseConfig):
     access_token_lifetime: int = 14400
     max_polling_tries: int = 24
     polling_wait_time: int = 5
+    max_request_rate: int = 300
+    request_burst: int = 10
     base_url: str = BASE_URL
 
     def _read_ini(self, parser: configparser.ConfigParser):
@@ -483,6 +592,8 @@ class TgtgConfig(BaseConfig):
         self._ini_get_int(parser, "TGTG", "AccessTokenLifetime", "access_token_lifetime")
         self._ini_get_int(parser, "TGTG", "MaxPollingTries", "max_polling_tries")
         self._ini_get_int(parser, "TGTG", "PollingWaitTime", "polling_wait_time")
+        self._ini_get_int(parser, "TGTG", "MaxRequestRate", "max_request_rate")
+        self._ini_get_int(parser, "TGTG", "RequestBurst", "request_burst")
 
     def _read_env(self):
         self._env_get("TGTG_USERNAME", "username")
@@ -493,6 +604,8 @@ class TgtgConfig(BaseConfig):
         self._env_get_int("TGTG_ACCESS_TOKEN_LIFETIME", "access_token_lifetime")
         self._env_get_int("TGTG_MAX_POLLING_TRIES", "max_polling_tries")
         self._env_get_int("TGTG_POLLING_WAIT_TIME", "polling_wait_time")
+        self._env_get_int("TGTG_MAX_REQUEST_RATE", "max_request_rate")
+        self._env_get_int("TGTG_REQUEST_BURST", "request_burst")
 
 
 @dataclass
@@ -530,6 +643,16 @@ class Config(BaseConfig):
     file: str | None = None
     item_ids: list[str] = field(default_factory=list)
     sleep_time: int = 60
+    workers: int = 1
+    adaptive_polling: bool = False
+    min_sleep_time: int = 20
+    max_sleep_time: int = 300
+    requests_per_minute: int = 20
+    item_intervals: dict[str, int] = field(default_factory=dict)
+    reservation_sleep_time: int = 5
+    state_snapshot_interval: int = 10
+    image_cache_size: int = 32
+    image_cache_path: str | None = None
     schedule_cron: Cron = field(default_factory=Cron)
     debug: bool = False
     locale: str = "en_US"
@@ -594,6 +717,10 @@ class Config(BaseConfig):
 
             log.info("Loaded config from environment variables")
 
+        try:
+            self.item_intervals = {str(item_id): int(interval) for item_id, interval in self.item_intervals.items()}
+        except (AttributeError, TypeError, ValueError) as err:
+            raise ConfigurationError(f"Invalid item intervals - {err}") from err
         self.token_path = getenv("TGTG_TOKEN_PATH")
         self._load_tokens()
         self.set_locale()
@@ -609,6 +736,16 @@ class Config(BaseConfig):
     def _read_ini(self, parser: configparser.ConfigParser):
         self._ini_get_list(parser, "MAIN", "ItemIDs", "item_ids")
         self._ini_get_int(parser, "MAIN", "SleepTime", "sleep_time")
+        self._ini_get_int(parser, "MAIN", "Workers", "workers")
+        self._ini_get_boolean(parser, "MAIN", "AdaptivePolling", "adaptive_polling")
+        self._ini_get_int(parser, "MAIN", "MinSleepTime", "min_sleep_time")
+        self._ini_get_int(parser, "MAIN", "MaxSleepTime", "max_sleep_time")
+        self._ini_get_int(parser, "MAIN", "RequestsPerMinute", "requests_per_minute")
+        self._ini_get_dict(parser, "MAIN", "ItemIntervals", "item_intervals")
+        self._ini_get_int(parser, "MAIN", "ReservationSleepTime", "reservation_sleep_time")
+        self._ini_get_int(parser, "MAIN", "StateSnapshotInterval", "state_snapshot_interval")
+        self._ini_get_int(parser, "MAIN", "ImageCacheSize", "image_cache_size")
+        self._ini_get(parser, "MAIN", "ImageCachePath", "image_cache_path")
         self._ini_get_cron(parser, "MAIN", "ScheduleCron", "schedule_cron")
         self._ini_get_boolean(parser, "MAIN", "Debug", "debug")
         self._ini_get(parser, "MAIN", "Locale", "locale")
@@ -623,6 +760,16 @@ class Config(BaseConfig):
     def _read_env(self):
         self._env_get_list("ITEM_IDS", "item_ids")
         self._env_get_int("SLEEP_TIME", "sleep_time")
+        self._env_get_int("WORKERS", "workers")
+        self._env_get_boolean("ADAPTIVE_POLLING", "adaptive_polling")
+        self._env_get_int("MIN_SLEEP_TIME", "min_sleep_time")
+        self._env_get_int("MAX_SLEEP_TIME", "max_sleep_time")
+        self._env_get_int("REQUESTS_PER_MINUTE", "requests_per_minute")
+        self._env_get_dict("ITEM_INTERVALS", "item_intervals")
+        self._env_get_int("RESERVATION_SLEEP_TIME", "reservation_sleep_time")
+        self._env_get_int("STATE_SNAPSHOT_INTERVAL", "state_snapshot_interval")
+        self._env_get_int("IMAGE_CACHE_SIZE", "image_cache_size")
+        self._env_get("IMAGE_CACHE_PATH", "image_cache_path")
         self._env_get_cron("SCHEDULE_CRON", "schedule_cron")
         self._env_get_boolean("DEBUG", "debug")
         self._env_get("LOCALE", "locale")
@@ -0,0 +1,196 @@
+import hashlib
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from http import HTTPStatus
+from pathlib import Path
+
+import requests
+from requests.adapters import HTTPAdapter
+
+log = logging.getLogger("tgtg")
+
+IMAGE_CACHE_SIZE = 32 * 1024 * 1024  # Bytes
+IMAGE_DISK_CACHE_SIZE = 256 * 1024 * 1024  # Bytes
+IMAGE_TTL = 24 * 3600  # Seconds until cached images are revalidated
+IMAGE_TIMEOUT = 10  # Seconds
+IMAGE_PREFETCH_WORKERS = 2
+
+
+@dataclass
+class CachedImage:
+    content: bytes
+    etag: str | None
+    fetched: float
+
+
+class ImageCache:
+    """Bounded LRU cache for item images.
+
+    Images are kept in memory up to `max_size` bytes and optionally on disk.
+    Images older than `ttl` are revalidated with their ETag. If revalidation
+    fails, the cached image is used. Concurrent requests for the same image
+    wait on a single download.
+    """
+
+    def __init__(
+        self,
+        max_size: int = IMAGE_CACHE_SIZE,
+        path: str | None = None,
+        max_disk_size: int = IMAGE_DISK_CACHE_SIZE,
+        ttl: int = IMAGE_TTL,
+        timeout: int = IMAGE_TIMEOUT,
+    ):
+        """
+        Args:
+            max_size (int): Max bytes kept in memory
+            path (str): Optional directory for the disk tier
+            max_disk_size (int): Max bytes kept on disk
+            ttl (int): Seconds until cached images are revalidated
+            timeout (int): Request timeout in seconds
+
+        """
+        self.max_size = max_size
+        self.path = Path(path) if path else None
+        self.max_disk_size = max_disk_size
+        self.ttl = ttl
+        self.timeout = timeout
+        self.session = requests.Session()
+        self.session.mount("https://", HTTPAdapter(pool_maxsize=IMAGE_PREFETCH_WORKERS + 2))
+        self.size = 0
+        self._images: OrderedDict[str, CachedImage] = OrderedDict()
+        self._downloads: dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=IMAGE_PREFETCH_WORKERS, thread_name_prefix="tgtg-image")
+        if self.path:
+            self.path.mkdir(parents=True, exist_ok=True)
+
+    def get(self, url: str) -> bytes | None:
+        """Returns the image from the cache and downloads it if needed.
+
+        Returns:
+            bytes: Image content or None if the image is not available
+
+        """
+        with self._lock:
+            image = self._get_cached(url)
+            if image is not None and time.time() - image.fetched < self.ttl:
+                return image.content
+            download = self._downloads.get(url)
+            if download is None:
+                self._downloads[url] = threading.Event()
+        if download is not None:
+            # Another thread is downloading the image
+            download.wait(self.timeout)
+            with self._lock:
+                image = self._get_cached(url)
+            return image.content if image else None
+        try:
+            image = self._download(url, image)
+        finally:
+            with self._lock:
+                self._downloads.pop(url).set()
+        return image.content if image else None
+
+    def prefetch(self, urls: Iterable[str]) -> None:
+        """Downloads missing or outdated images in the background."""
+        for url in urls:
+            with self._lock:
+                image = self._images.get(url)
+                if url in self._downloads or (image is not None and time.time() - image.fetched < self.ttl):
+                    continue
+            self._executor.submit(self.get, url)
+
+    def stop(self) -> None:
+        """Cancels pending prefetches."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def _get_cached(self, url: str) -> CachedImage | None:
+        image = self._images.get(url)
+        if image is not None:
+            self._images.move_to_end(url)
+            return image
+        image = self._load(url)
+        if image is not None:
+            self._add(url, image)
+        return image
+
+    def _add(self, url: str, image: CachedImage) -> None:
+        old = self._images.pop(url, None)
+        if old is not None:
+            self.size -= len(old.content)
+        if len(image.content) > self.max_size:
+            return
+        self._images[url] = image
+        self.size += len(image.content)
+        while self.size > self.max_size:
+            _, evicted = self._images.popitem(last=False)
+            self.size -= len(evicted.content)
+
+    def _download(self, url: str, cached: CachedImage | None) -> CachedImage | None:
+        headers = {"If-None-Match": cached.etag} if cached and cached.etag else {}
+        try:
+            response = self.session.get(url, headers=headers, timeout=self.timeout)
+        except requests.RequestException as err:
+            log.warning("Get Image Error: %s", err)
+            return cached
+        if response.status_code == HTTPStatus.NOT_MODIFIED and cached is not None:
+            image = CachedImage(cached.content, cached.etag, time.time())
+        elif response.status_code == HTTPStatus.OK:
+            image = CachedImage(response.content, response.headers.get("ETag"), time.time())
+        else:
+            log.warning("Get Image Error: %s - %s", response.status_code, response.content)
+            return cached
+        with self._lock:
+            self._add(url, image)
+        self._save(url, image)
+        return image
+
+    def _file(self, url: str) -> Path | None:
+        if self.path is None:
+            return None
+        return self.path / hashlib.sha256(url.encode("utf-8")).hexdigest()
+
+    def _load(self, url: str) -> CachedImage | None:
+        file = self._file(url)
+        if file is None:
+            return None
+        try:
+            meta = json.loads(file.with_suffix(".json").read_text(encoding="utf-8"))
+            return CachedImage(file.read_bytes(), meta.get("etag"), float(meta["fetched"]))
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError, TypeError) as err:
+            log.warning("Failed to read cached image - %s", err)
+            return None
+
+    def _save(self, url: str, image: CachedImage) -> None:
+        file = self._file(url)
+        if file is None:
+            return
+        try:
+            file.write_bytes(image.content)
+            file.with_suffix(".json").write_text(json.dumps({"etag": image.etag, "fetched": image.fetched}), encoding="utf-8")
+            self._prune()
+        except OSError as err:
+            log.warning("Failed to save image - %s", err)
+
+    def _prune(self) -> None:
+        """Removes the least recently written images while the disk tier is too large."""
+        if self.path is None:
+            return
+        files = sorted(
+            (file.stat().st_mtime, file.stat().st_size, file) for file in self.path.iterdir() if file.suffix != ".json"
+        )
+        size = sum(file_size for _, file_size, _ in files)
+        for _, file_size, file in files:
+            if size <= self.max_disk_size:
+                break
+            file.unlink(missing_ok=True)
+            file.with_suffix(".json").unlink(missing_ok=True)
+            size -= file_size
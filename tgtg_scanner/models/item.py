@@ -1,15 +1,17 @@
 import datetime
 import logging
-import re
-from http import HTTPStatus
+import threading
+from collections.abc import Callable
+from functools import cached_property
 from typing import Any
 
 import babel.numbers
 import humanize
-import requests
 
 from tgtg_scanner.errors import MaskConfigurationError
+from tgtg_scanner.models.image_cache import ImageCache
 from tgtg_scanner.models.location import DistanceTime, Location
+from tgtg_scanner.models.template import compile_template
 
 ATTRS = [
     "item_id",
@@ -47,48 +49,147 @@ ATTRS = [
 log = logging.getLogger("tgtg")
 
 
+class ItemSnapshot:
+    """Compact state of an item used to detect changes between scans.
+
+    Holds only what the scanner compares, so the state of many items stays small.
+    """
+
+    __slots__ = ("item_id", "items_available", "fingerprint")
+
+    def __init__(self, item_id: str, items_available: int, fingerprint: int):
+        self.item_id = item_id
+        self.items_available = items_available
+        self.fingerprint = fingerprint
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "ItemSnapshot":
+        """Creates the snapshot of a raw item from the TGTG API."""
+        item = data.get("item", {})
+        price = item.get("item_price", {})
+        value = item.get("item_value", {})
+        pickup_interval = data.get("pickup_interval", {})
+        # Hash of the fields relevant for notifications and metrics
+        fingerprint = hash(
+            (
+                data.get("items_available", 0),
+                pickup_interval.get("start"),
+                pickup_interval.get("end"),
+                price.get("code"),
+                price.get("minor_units"),
+                price.get("decimals"),
+                value.get("minor_units"),
+                value.get("decimals"),
+            )
+        )
+        return cls(item.get("item_id"), data.get("items_available", 0), fingerprint)
+
+    def __repr__(self) -> str:
+        return f"ItemSnapshot({self.item_id!r}, {self.items_available!r})"
+
+
 class Item:
     """Takes the raw data from the TGTG API and
     returns well formated data for notifications.
     """
 
+    # Shared by all items, replaced by the scanner with the configured cache
+    image_cache = ImageCache()
+
     def __init__(self, data: dict, location: Location | None = None, locale: str = "en_US", time_format: str = "24h"):
+        # Fields are extracted from the raw data on first access and cached,
+        # as most items are never notified.
+        self.data = data
+        self._item: dict = data.get("item", {})
+        self.item_id: str = self._item.get("item_id")  # type: ignore[assignment]
         self.items_available: int = data.get("items_available", 0)
-        self.display_name: str = data.get("display_name", "-")
-        self.favorite: str = "Yes" if data.get("favorite", False) else "No"
-        self.pickup_interval_start: str | None = data.get("pickup_interval", {}).get("start")
-        self.pickup_interval_end: str | None = data.get("pickup_interval", {}).get("end")
-        self.pickup_location: str = data.get("pickup_location", {}).get("address", {}).get("address_line", "-")
-
-        item: dict = data.get("item", {})
-        self.item_id: str = item.get("item_id")  # type: ignore[assignment]
-        self._rating: float | None = item.get("average_overall_rating", {}).get("average_overall_rating")
-        self.packaging_option: str = item.get("packaging_option", "-")
-        self.item_name: str = item.get("name", "-")
-        self.buffet: str = "Yes" if item.get("buffet", False) else "No"
-        self.item_category: str = item.get("item_category", "-")
-        self.description: str = item.get("description", "-")
-        item_price: dict = item.get("item_price", {})
-        item_value: dict = item.get("item_value", {})
-        self._price: float = item_price.get("minor_units", 0) / 10 ** item_price.get("decimals", 0)
-        self._value: float = item_value.get("minor_units", 0) / 10 ** item_value.get("decimals", 0)
-        self.currency: str = item_price.get("code", "-")
-        self.item_logo: str = item.get("logo_picture", {}).get(
+        self._scanned_on = datetime.datetime.now()
+        # Formatted variables shared by all notifiers
+        self._fields: dict[str, str] = {}
+        self._fields_lock = threading.Lock()
+        self.location = location
+        self.locale = locale
+        self.time_format = time_format
+
+    @cached_property
+    def display_name(self) -> str:
+        return self.data.get("display_name", "-")
+
+    @cached_property
+    def favorite(self) -> str:
+        return "Yes" if self.data.get("favorite", False) else "No"
+
+    @cached_property
+    def pickup_interval_start(self) -> str | None:
+        return self.data.get("pickup_interval", {}).get("start")
+
+    @cached_property
+    def pickup_interval_end(self) -> str | None:
+        return self.data.get("pickup_interval", {}).get("end")
+
+    @cached_property
+    def pickup_location(self) -> str:
+        return self.data.get("pickup_location", {}).get("address", {}).get("address_line", "-")
+
+    @cached_property
+    def _rating(self) -> float | None:
+        return self._item.get("average_overall_rating", {}).get("average_overall_rating")
+
+    @cached_property
+    def packaging_option(self) -> str:
+        return self._item.get("packaging_option", "-")
+
+    @cached_property
+    def item_name(self) -> str:
+        return self._item.get("name", "-")
+
+    @cached_property
+    def buffet(self) -> str:
+        return "Yes" if self._item.get("buffet", False) else "No"
+
+    @cached_property
+    def item_category(self) -> str:
+        return self._item.get("item_category", "-")
+
+    @cached_property
+    def description(self) -> str:
+        return self._item.get("description", "-")
+
+    @cached_property
+    def _price(self) -> float:
+        item_price: dict = self._item.get("item_price", {})
+        return item_price.get("minor_units", 0) / 10 ** item_price.get("decimals", 0)
+
+    @cached_property
+    def _value(self) -> float:
+        item_value: dict = self._item.get("item_value", {})
+        return item_value.get("minor_units", 0) / 10 ** item_value.get("decimals", 0)
+
+    @cached_property
+    def currency(self) -> str:
+        return self._item.get("item_price", {}).get("code", "-")
+
+    @cached_property
+    def item_logo(self) -> str:
+        return self._item.get("logo_picture", {}).get(
             "current_url",
             "https://tgtg-mkt-cms-prod.s3.eu-west-1.amazonaws.com/13512/TGTG_Icon_White_Cirle_1988x1988px_RGB.png",
         )
-        self.item_cover: str = item.get("cover_picture", {}).get(
+
+    @cached_property
+    def item_cover(self) -> str:
+        return self._item.get("cover_picture", {}).get(
             "current_url",
             "https://images.tgtg.ninja/standard_images/GENERAL/other1.jpg",
         )
 
-        store: dict = data.get("store", {})
-        self.store_name: str = store.get("store_name", "-")
+    @cached_property
+    def store_name(self) -> str:
+        return self.data.get("store", {}).get("store_name", "-")
 
-        self.scanned_on: str = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        self.location = location
-        self.locale = locale
-        self.time_format = time_format
+    @cached_property
+    def scanned_on(self) -> str:
+        return self._scanned_on.strftime("%Y-%m-%d %H:%M:%S")
 
     @property
     def rating(self) -> str:
@@ -125,17 +226,13 @@ class Item:
 
         Raises MaskConfigurationError
         """
-        for match in re.finditer(r"\${{([a-zA-Z0-9_]+)}}", text):
-            if match.group(1) not in ATTRS:
-                raise MaskConfigurationError(match.group(0))
+        for name in compile_template(text).variables:
+            if name not in ATTRS:
+                raise MaskConfigurationError(f"${{{{{name}}}}}")
 
-    @staticmethod
-    def get_image(url: str) -> bytes | None:
-        response = requests.get(url)
-        if not response.status_code == HTTPStatus.OK:
-            log.warning("Get Image Error: %s - %s", response.status_code, response.content)
-            return None
-        return response.content
+    @classmethod
+    def get_image(cls, url: str) -> bytes | None:
+        return cls.image_cache.get(url)
 
     @property
     def item_logo_bytes(self) -> bytes | None:
@@ -149,20 +246,35 @@ class Item:
     def link(self) -> str:
         return f"https://share.toogoodtogo.com/item/{self.item_id}"
 
-    def _get_variables(self, text: str) -> list[re.Match]:
-        """Returns a list of all variables in the provided string."""
-        return list(re.finditer(r"\${{([a-zA-Z0-9_]+)}}", text))
+    def unmask(self, text: str, escape: Callable[[str], str] | None = None) -> str:
+        """Replaces variables with the current values.
 
-    def unmask(self, text: str) -> str:
-        """Replaces variables with the current values."""
+        Args:
+            text (str): Template text
+            escape (Callable, optional): Escapes the values, e.g. for Markdown or HTML
+
+        """
         if text in ["${{item_logo_bytes}}", "${{item_cover_bytes}}"]:
-            matches = self._get_variables(text)
-            return getattr(self, matches[0].group(1))
-        for match in self._get_variables(text):
-            if hasattr(self, match.group(1)):
-                val = getattr(self, match.group(1))
-                text = text.replace(match.group(0), str(val))
-        return text
+            return getattr(self, text[3:-2])
+        return compile_template(text).render(self.field, escape)
+
+    def field(self, name: str) -> str:
+        """Returns the formatted value of a variable.
+
+        Each value is computed once per item, even if several notifiers
+        render it at the same time. A changed item is a new Item instance,
+        so values never outlive the item version they were computed for.
+
+        Raises AttributeError for unknown variables.
+        """
+        try:
+            return self._fields[name]
+        except KeyError:
+            pass
+        with self._fields_lock:
+            if name not in self._fields:
+                self._fields[name] = str(getattr(self, name))
+            return self._fields[name]
 
     @property
     def pickupdate(self) -> str:
@@ -220,3 +332,67 @@ class Item:
                 if _type == "duration":
                     return self._get_duration(_mode)
             raise
+
+
+class ItemBatch:
+    """Items coalesced into one digest notification.
+
+    The digest is rendered with the batch template. ${{items}} is replaced by
+    the notification body rendered for each item and ${{count}} by the number
+    of items. Other variables and settings like titles or URLs are rendered
+    with the first item.
+    """
+
+    DEFAULT_TEMPLATE = "${{items}}"
+    # Variables of the batch template besides the item attributes
+    VARIABLES = ["items", "count"]
+
+    def __init__(self, items: list[Item], template: str | None = None):
+        self.items = items
+        self.template = template or ItemBatch.DEFAULT_TEMPLATE
+
+    @staticmethod
+    def check_mask(text: str) -> None:
+        """Checks whether the variables in the provided batch template are available.
+
+        Raises MaskConfigurationError
+        """
+        for name in compile_template(text).variables:
+            if name not in ATTRS and name not in ItemBatch.VARIABLES:
+                raise MaskConfigurationError(f"${{{{{name}}}}}")
+
+    @property
+    def item_id(self) -> str:
+        return self.items[0].item_id
+
+    def unmask(self, text: str, escape: Callable[[str], str] | None = None) -> str:
+        """Renders the text with the first item."""
+        return self.items[0].unmask(text, escape)
+
+    def digest(self, body: str, escape: Callable[[str], str] | None = None, separator: str = "\n\n") -> str:
+        """Renders the batch template.
+
+        Args:
+            body (str): Notification body for each item
+            escape (Callable, optional): Escapes the values, e.g. for Markdown or HTML
+            separator (str): Joins the item bodies
+
+        """
+        values = {
+            "items": separator.join(item.unmask(body, escape) for item in self.items),
+            "count": str(len(self.items)),
+        }
+
+        def resolve(name: str) -> str:
+            if name in values:
+                return values[name]
+            value = self.items[0].field(name)
+            return escape(value) if escape else value
+
+        return compile_template(self.template).render(resolve)
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __repr__(self) -> str:
+        return f"ItemBatch({[item.item_id for item in self.items]!r})"
@@ -1,6 +1,6 @@
 import logging
 
-from prometheus_client import Counter, Gauge, start_http_server
+from prometheus_client import Counter, Gauge, Histogram, start_http_server
 
 from tgtg_scanner.models.item import Item
 
@@ -19,17 +19,41 @@ class Metrics:
             "tgtg_get_favorites_errors",
             "Count of request errors fetching tgtg favorites",
         )
+        self.items_changed = Counter("tgtg_items_changed", "Count of polled items that changed")
+        self.items_unchanged = Counter("tgtg_items_unchanged", "Count of polled items that did not change")
+        self.request_rate = Gauge("tgtg_request_rate", "Current max TGTG API requests per minute")
+        self.rate_limiter_tokens = Gauge("tgtg_rate_limiter_tokens", "Requests available in the rate limiter bucket")
+        self.captcha_cooldown = Gauge("tgtg_captcha_cooldown_seconds", "Remaining pause of API requests after captcha errors")
+        self.order_latency = Histogram(
+            "tgtg_order_latency_seconds",
+            "Latency from stock seen to order created",
+            buckets=(0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+        )
         self.send_notifications = Counter(
             "tgtg_send_notifications",
             "Count of send notifications",
             ["item_id", "display_name"],
         )
+        self.notifier_queue_depth = Gauge(
+            "tgtg_notifier_queue_depth",
+            "Notifications waiting in the queue of a notifier",
+            ["notifier"],
+        )
+        self.notifier_dropped = Counter(
+            "tgtg_notifier_dropped_notifications",
+            "Count of notifications discarded by a full queue or expired",
+            ["notifier", "reason"],
+        )
 
     def enable_metrics(self) -> None:
         """Start the metrics http server."""
         start_http_server(self.port)
         log.info("Metrics server started on port %s", self.port)
 
+    def count_dropped_notification(self, notifier: str, reason: str) -> None:
+        """Count a notification discarded by a notifier queue."""
+        self.notifier_dropped.labels(notifier, reason).inc()
+
     def update(self, item: Item) -> None:
         """Update the metrics."""
         try:
@@ -1,12 +1,17 @@
 import logging
-from collections.abc import Callable
+import threading
+from collections.abc import Callable, Iterable, Mapping
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 
-from tgtg_scanner.models.item import Item
+from tgtg_scanner.models.item import Item, ItemSnapshot
 from tgtg_scanner.tgtg import TgtgClient
 
 log = logging.getLogger("tgtg")
 
+# Max parallel requests when cancelling orders
+MAX_CANCEL_WORKERS = 8
+
 
 @dataclass
 class Order:
@@ -21,48 +26,133 @@ class Reservation:
     item_id: str
     amount: int
     display_name: str
+    priority: int = 0
 
 
 class Reservations:
     def __init__(self, client: TgtgClient) -> None:
         self.client = client
-        self.reservation_query: list[Reservation] = []
         self.active_orders: dict[str, Order] = {}
-
-    def reserve(self, item_id: str, display_name: str, amount: int = 1) -> None:
-        """Create a new reservation.
+        # Pending reservations by item id
+        self._reservations: dict[str, Reservation] = {}
+        # Item ids reserved or failed to order since the last call of make_orders
+        self._added: set[str] = set()
+        self._lock = threading.Lock()
+
+    @property
+    def reservation_query(self) -> list[Reservation]:
+        """Pending reservations ordered by priority."""
+        with self._lock:
+            return sorted(self._reservations.values(), key=lambda res: res.priority, reverse=True)
+
+    @property
+    def item_ids(self) -> list[str]:
+        """Item IDs with pending reservations."""
+        with self._lock:
+            return list(self._reservations)
+
+    def reserve(self, item_id: str, display_name: str, amount: int = 1, priority: int = 0) -> None:
+        """Create a reservation for the item.
+
+        Each item has at most one pending reservation. Reserving an item again
+        replaces its pending reservation, so a repeated request does not raise
+        the ordered amount.
 
         Args:
             item_id (str): Item ID
             display_name (str): Item display name
             amount (int, optional): Amount. Defaults to 1.
+            priority (int, optional): Reservations with higher priority are ordered first. Defaults to 0.
 
         """
-        self.reservation_query.append(Reservation(item_id, amount, display_name))
+        with self._lock:
+            if item_id in self._reservations:
+                log.debug("Replacing pending reservation of %s", display_name)
+            self._reservations[item_id] = Reservation(item_id, amount, display_name, priority)
+            self._added.add(item_id)
+
+    def remove(self, item_id: str) -> None:
+        """Remove the pending reservation of an item.
+
+        Args:
+            item_id (str): Item ID
 
-    def make_orders(self, state: dict[str, Item], callback: Callable[[Reservation], None]) -> None:
-        """Create orders for reservations.
+        """
+        with self._lock:
+            self._reservations.pop(item_id, None)
+            self._added.discard(item_id)
+
+    def is_reserved(self, item_id: str) -> bool:
+        """Returns True if there is a pending reservation for the item."""
+        return item_id in self._reservations
+
+    def make_orders(
+        self,
+        state: Mapping[str, Item | ItemSnapshot],
+        callback: Callable[[Reservation], None],
+        item_ids: Iterable[str] | None = None,
+    ) -> None:
+        """Create orders for new reservations and reservations of changed items.
 
         Args:
-            state (Dict[str, Item]): Current item state
+            state (Mapping[str, Item | ItemSnapshot]): Current item state
             callback (Callable[[Reservation], None]): Callback for each order
+            item_ids (Iterable[str], optional): IDs of changed items. Defaults to all reserved items.
 
         """
-        for reservation in self.reservation_query:
+        with self._lock:
+            candidates = self._added | (self._reservations.keys() if item_ids is None else set(item_ids))
+            self._added = set()
+            reservations = [self._reservations[item_id] for item_id in candidates if item_id in self._reservations]
+        for reservation in sorted(reservations, key=lambda res: res.priority, reverse=True):
             item = state.get(reservation.item_id)
             if item and item.items_available > 0:
-                try:
-                    self._create_order(reservation)
-                    self.reservation_query.remove(reservation)
-                    callback(reservation)
-                except Exception as exc:
-                    log.warning("Order failed: %s", exc)
+                self.make_order(reservation.item_id, callback, item.items_available)
+
+    def make_order(self, item_id: str, callback: Callable[[Reservation], None], items_available: int | None = None) -> bool:
+        """Create an order for the pending reservation of an available item.
+
+        Args:
+            item_id (str): Item ID
+            callback (Callable[[Reservation], None]): Callback for the order
+            items_available (int, optional): Available bags, limits the ordered amount
+
+        Returns:
+            bool: True if an order was created
+
+        """
+        # Take the reserved amount, so concurrent callers can't order it twice
+        with self._lock:
+            pending = self._reservations.get(item_id)
+            if pending is None:
+                return False
+            amount = pending.amount if items_available is None else min(pending.amount, items_available)
+            reservation = Reservation(item_id, amount, pending.display_name, pending.priority)
+            pending.amount -= amount
+            if pending.amount <= 0:
+                del self._reservations[item_id]
+        try:
+            self._create_order(reservation)
+        except Exception as exc:
+            log.warning("Order failed: %s", exc)
+            with self._lock:
+                pending = self._reservations.setdefault(
+                    item_id, Reservation(item_id, 0, reservation.display_name, reservation.priority)
+                )
+                pending.amount += amount
+                # Retry on the next call of make_orders
+                self._added.add(item_id)
+            return False
+        callback(reservation)
+        return True
 
     def update_active_orders(self) -> None:
         """Remove orders that are not active anymore."""
+        if not self.active_orders:
+            return
+        reserved = {order.get("order_id") for order in self.client.get_active_orders() if order.get("state") == "RESERVED"}
         for order_id in list(self.active_orders):
-            res = self.client.get_order_status(order_id)
-            if res.get("state") != "RESERVED":
+            if order_id not in reserved:
                 del self.active_orders[order_id]
 
     def cancel_order(self, order_id: str) -> None:
@@ -70,9 +160,14 @@ class Reservations:
         self.client.abort_order(order_id)
 
     def cancel_all_orders(self) -> None:
-        """Cancel all active orders."""
-        for order_id in list(self.active_orders):
-            self.cancel_order(order_id)
+        """Cancel all active orders in parallel."""
+        order_ids = list(self.active_orders)
+        if len(order_ids) <= 1:
+            for order_id in order_ids:
+                self.cancel_order(order_id)
+            return
+        with ThreadPoolExecutor(max_workers=min(len(order_ids), MAX_CANCEL_WORKERS)) as executor:
+            list(executor.map(self.cancel_order, order_ids))
 
     def _create_order(self, reservation: Reservation) -> None:
         res = self.client.create_order(reservation.item_id, reservation.amount)
@@ -0,0 +1,105 @@
+import datetime
+from random import random
+
+from tgtg_scanner.models.item import Item
+
+# Restocks needed before hours without restocks are considered cold
+MIN_RESTOCKS = 5
+# Start polling faster this long before the pickup window opens
+PICKUP_LEAD_TIME = datetime.timedelta(hours=1)
+
+
+class AdaptiveScheduler:
+    """Calculates the wait time until the next scan.
+
+    Learns the hours of the day in which items restocked and polls more
+    often during these hours and around pickup windows. Hours that never had
+    a restock are polled less often. The wait time never falls below the
+    requests per minute budget. Configured item intervals always take precedence.
+    """
+
+    def __init__(
+        self,
+        sleep_time: int = 60,
+        enabled: bool = False,
+        min_sleep_time: int = 20,
+        max_sleep_time: int = 300,
+        requests_per_minute: int = 20,
+        item_intervals: dict[str, int] | None = None,
+    ):
+        self.sleep_time = sleep_time
+        self.enabled = enabled
+        self.min_sleep_time = min(min_sleep_time, sleep_time)
+        self.max_sleep_time = max(max_sleep_time, sleep_time)
+        self.requests_per_minute = requests_per_minute
+        self.item_intervals = item_intervals or {}
+        # restock count per item and hour of the day
+        self.restocks: dict[str, list[int]] = {}
+        # latest pickup window per item
+        self.pickup_windows: dict[str, tuple[datetime.datetime, datetime.datetime]] = {}
+
+    def observe(self, item: Item, previous_amount: int | None, now: datetime.datetime | None = None) -> None:
+        """Learn from a changed item.
+
+        Args:
+            item (Item): Changed item
+            previous_amount (int): Available amount before the change or None for new items
+            now (datetime): Time of the observation
+
+        """
+        now = now or datetime.datetime.now()
+        if item.pickup_interval_start and item.pickup_interval_end:
+            self.pickup_windows[item.item_id] = (
+                Item._datetimeparse(item.pickup_interval_start),
+                Item._datetimeparse(item.pickup_interval_end),
+            )
+        if previous_amount == 0 and item.items_available > 0:
+            self.restocks.setdefault(item.item_id, [0] * 24)[now.hour] += 1
+
+    def item_sleep_time(self, item_id: str, now: datetime.datetime | None = None) -> int:
+        """Wait time for an item based on its configured interval,
+        restock history and pickup window.
+
+        Args:
+            item_id (str): Item ID
+            now (datetime): Current time
+
+        Returns:
+            int: wait time in seconds
+
+        """
+        if item_id in self.item_intervals:
+            return self.item_intervals[item_id]
+        if not self.enabled:
+            return self.sleep_time
+        now = now or datetime.datetime.now()
+        pickup_window = self.pickup_windows.get(item_id)
+        if pickup_window is not None:
+            start, end = pickup_window
+            if start - PICKUP_LEAD_TIME <= now.astimezone() <= end:
+                return self.min_sleep_time
+        restocks = self.restocks.get(item_id)
+        if restocks is None:
+            return self.sleep_time
+        if any(restocks[(now.hour + offset) % 24] for offset in (-1, 0, 1)):
+            return self.min_sleep_time
+        if sum(restocks) >= MIN_RESTOCKS:
+            return self.max_sleep_time
+        return self.sleep_time
+
+    def next_sleep(self, item_ids: list[str], requests_per_scan: int, now: datetime.datetime | None = None) -> float:
+        """Wait time until the next scan.
+
+        Args:
+            item_ids (List): IDs of all monitored items
+            requests_per_scan (int): Number of API requests needed for one scan
+            now (datetime): Current time
+
+        Returns:
+            float: wait time in seconds, randomized by +/- 10%
+
+        """
+        sleep_time: float = min((self.item_sleep_time(item_id, now) for item_id in item_ids), default=self.sleep_time)
+        if self.enabled and self.requests_per_minute > 0:
+            sleep_time = max(sleep_time, requests_per_scan * 60 / self.requests_per_minute)
+        return sleep_time * (0.9 + 0.2 * random())
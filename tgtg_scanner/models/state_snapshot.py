@@ -0,0 +1,89 @@
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+
+log = logging.getLogger("tgtg")
+
+STATE_SNAPSHOT_FILE = "scannerState"
+# Items not seen for longer are not restored
+STATE_SNAPSHOT_MAX_AGE = 24 * 3600  # Seconds
+
+
+class StateSnapshot:
+    """Persists the last seen amount of each item to restore the state after a restart.
+
+    Amounts are collected with `seen` and written to an SQLite database
+    every `interval` cycles. Each write replaces the whole snapshot in one
+    transaction, so a crash never leaves a partial snapshot behind.
+    """
+
+    def __init__(self, path: str | None, interval: int = 10, max_age: int = STATE_SNAPSHOT_MAX_AGE):
+        """
+        Args:
+            path (str): Directory of the snapshot, None disables the snapshot
+            interval (int): Cycles between two writes, 0 disables the snapshot
+            max_age (int): Seconds after which items are not restored anymore
+
+        """
+        self.file = Path(path, STATE_SNAPSHOT_FILE) if path and interval > 0 else None
+        self.interval = interval
+        self.max_age = max_age
+        self.items: dict[str, tuple[int, float]] = {}
+        self._cycles = 0
+        self._lock = threading.Lock()
+
+    def load(self) -> dict[str, int]:
+        """Reads the snapshot.
+
+        Returns:
+            Dict: Last seen amount by item id of items seen within max_age
+
+        """
+        if self.file is None or not self.file.exists():
+            return {}
+        try:
+            with closing(sqlite3.connect(self.file)) as connection:
+                rows = connection.execute(
+                    "SELECT item_id, items_available, last_seen FROM items WHERE last_seen >= ?",
+                    (time.time() - self.max_age,),
+                ).fetchall()
+        except sqlite3.Error as err:
+            log.warning("Failed to read state snapshot - %s", err)
+            return {}
+        with self._lock:
+            self.items.update({item_id: (amount, last_seen) for item_id, amount, last_seen in rows})
+        log.debug("Restored %s items from state snapshot", len(rows))
+        return {item_id: amount for item_id, amount, _ in rows}
+
+    def seen(self, item_id: str, items_available: int) -> None:
+        """Records the current amount of an item."""
+        with self._lock:
+            self.items[item_id] = (items_available, time.time())
+
+    def cycle(self) -> None:
+        """Counts a scan cycle and writes the snapshot every interval cycles."""
+        if self.file is None:
+            return
+        self._cycles += 1
+        if self._cycles % self.interval == 0:
+            self.save()
+
+    def save(self) -> None:
+        """Writes the snapshot."""
+        if self.file is None:
+            return
+        with self._lock:
+            rows = [(item_id, amount, last_seen) for item_id, (amount, last_seen) in self.items.items()]
+        try:
+            with closing(sqlite3.connect(self.file)) as connection, connection:
+                connection.execute(
+                    "CREATE TABLE IF NOT EXISTS items "
+                    "(item_id TEXT PRIMARY KEY, items_available INTEGER NOT NULL, last_seen REAL NOT NULL)"
+                )
+                connection.execute("DELETE FROM items")
+                connection.executemany("INSERT INTO items VALUES (?, ?, ?)", rows)
+        except sqlite3.Error as err:
+            log.warning("Failed to save state snapshot - %s", err)
@@ -0,0 +1,55 @@
+import json
+import re
+from collections.abc import Callable
+from functools import lru_cache
+
+VARIABLE = re.compile(r"\${{([a-zA-Z0-9_]+)}}")
+
+
+def escape_json(text: str) -> str:
+    """Escapes text for use inside a JSON string."""
+    return json.dumps(text, ensure_ascii=False)[1:-1]
+
+
+class Template:
+    """Notification template parsed into literal and variable segments.
+
+    Variables are written as ${{name}}. Each variable is resolved once per
+    rendering, even if it appears several times. Unknown variables, for which
+    the resolver raises an AttributeError, are kept as they are and escaped
+    like values, so they do not break the markup of the notification.
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        # Variable names at odd indices, literals at even indices
+        self.segments: list[str] = VARIABLE.split(text)
+        self.variables: list[str] = list(dict.fromkeys(self.segments[1::2]))
+
+    def render(self, resolve: Callable[[str], str], escape: Callable[[str], str] | None = None) -> str:
+        """Renders the template in one pass.
+
+        Args:
+            resolve (Callable): Returns the value of a variable, e.g. Item.field
+            escape (Callable, optional): Escapes variable values, e.g. escape_json
+
+        Returns:
+            str: Rendered text
+
+        """
+        if not self.variables:
+            return self.text
+        values: dict[str, str] = {}
+        for name in self.variables:
+            try:
+                value = resolve(name)
+            except AttributeError:
+                value = f"${{{{{name}}}}}"
+            values[name] = escape(value) if escape else value
+        return "".join(values[segment] if i % 2 else segment for i, segment in enumerate(self.segments))
+
+
+@lru_cache(maxsize=256)
+def compile_template(text: str) -> Template:
+    """Returns the parsed template of a text. Templates are parsed once and cached."""
+    return Template(text)
@@ -1,4 +1,7 @@
 # flake8: noqa
 
 from tgtg_scanner.notifiers.base import Notifier
+from tgtg_scanner.notifiers.dead_letters import DeadLetters
+from tgtg_scanner.notifiers.dispatcher import Dispatcher
+from tgtg_scanner.notifiers.notification_queue import NotificationQueue
 from tgtg_scanner.notifiers.notifiers import Notifiers
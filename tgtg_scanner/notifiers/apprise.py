@@ -3,7 +3,7 @@ import logging
 import apprise
 
 from tgtg_scanner.errors import AppriseConfigurationError, MaskConfigurationError
-from tgtg_scanner.models import Config, Favorites, Item, Reservations
+from tgtg_scanner.models import Config, Favorites, Item, ItemBatch, Reservations
 from tgtg_scanner.models.reservations import Reservation
 from tgtg_scanner.notifiers.base import Notifier
 
@@ -22,7 +22,7 @@ class Apprise(Notifier):
         self.title = config.apprise.title
         self.body = config.apprise.body
         self.url = config.apprise.url
-        self.cron = config.apprise.cron
+        self._apply_config(config.apprise)
         if self.enabled:
             if self.url is None or self.body is None or self.title is None:
                 raise AppriseConfigurationError()
@@ -33,14 +33,14 @@ class Apprise(Notifier):
             except MaskConfigurationError as exc:
                 raise AppriseConfigurationError(exc.message) from exc
 
-    def _send(self, item: Item | Reservation) -> None:
+    def _send(self, item: Item | ItemBatch | Reservation) -> None:
         """Sends item information via configured Apprise URL."""
-        if isinstance(item, Item):
+        if isinstance(item, (Item, ItemBatch)):
             if self.url is None or self.body is None or self.title is None:
                 raise AppriseConfigurationError()
             url = item.unmask(self.url)
             title = item.unmask(self.title)
-            body = item.unmask(self.body)
+            body = self._unmask_body(item, self.body)
 
             log.debug("Apprise url: %s", url)
             log.debug("Apprise title: %s", title)
@@ -1,16 +1,43 @@
+import asyncio
+import concurrent.futures
+import inspect
 import logging
-import threading
+import random
 from abc import ABC, abstractmethod
-from queue import Queue
+from collections.abc import Awaitable, Callable
+from typing import Any, TypeVar, cast
 
-from tgtg_scanner.models import Config, Cron, Favorites, Item, Reservations
+from tgtg_scanner.errors import ConfigurationError
+from tgtg_scanner.models import Config, Cron, Favorites, Item, ItemBatch, Reservations
+from tgtg_scanner.models.config import NotifierConfig
 from tgtg_scanner.models.reservations import Reservation
+from tgtg_scanner.notifiers.dead_letters import DeadLetters
+from tgtg_scanner.notifiers.dispatcher import Dispatcher
+from tgtg_scanner.notifiers.notification_queue import NotificationQueue
 
 log = logging.getLogger("tgtg")
 
+MAX_RETRY_DELAY = 300  # Seconds
+
+T = TypeVar("T")
+
 
 class Notifier(ABC):
-    """Base Notifier."""
+    """Base Notifier.
+
+    Each notifier consumes its queue in a coroutine on the event loop of a
+    Dispatcher. Notifiers implement `_send` either as coroutine or as
+    blocking function, which is called in the thread pool of the dispatcher.
+
+    With a batch window, items arriving within the window are coalesced into
+    one ItemBatch, which notifiers render as digest with `_unmask_body`.
+
+    Failed notifications are retried with exponential backoff in separate
+    tasks, so they do not block the queue. Notifications that still fail
+    are written to the dead letter file.
+    """
+
+    batch_separator = "\n\n"
 
     @abstractmethod
     def __init__(self, config: Config, reservations: Reservations, favorites: Favorites):
@@ -19,34 +46,166 @@ class Notifier(ABC):
         self.reservations = reservations
         self.favorites = favorites
         self.cron = Cron()
-        self.thread = threading.Thread(target=self._run)
-        self.queue: Queue[Item | Reservation | None] = Queue()
+        self.batch_window = 0  # Milliseconds
+        self.batch_size = 10
+        self.batch_body: str | None = None
+        self.retries = 3
+        self.retry_delay: float = 5  # Seconds
+        self.dead_letters = DeadLetters(config.token_path)
+        self.dispatcher: Dispatcher | None = None
+        self.queue: NotificationQueue[Item | Reservation | None] = NotificationQueue()
+        self.task: concurrent.futures.Future | None = None
+        self._own_dispatcher = False
+        self._retry_tasks: set[asyncio.Task] = set()
+
+    def _apply_config(self, config: NotifierConfig) -> None:
+        """Applies the schedule, queue, retry and batch settings of the notifier section."""
+        self.cron = config.cron
+        self.queue = NotificationQueue.from_config(config)
+        self.retries = config.retries
+        self.retry_delay = config.retry_delay
+        self.batch_window = config.batch_window
+        self.batch_size = config.batch_size
+        self.batch_body = config.batch_body
 
     @property
     def name(self):
         """Get notifier name."""
         return self.__class__.__name__
 
-    def _run(self) -> None:
+    async def _run(self) -> None:
         """Run notifier."""
         self.config.set_locale()
-        while True:
-            try:
-                item = self.queue.get()
+        try:
+            await self._setup()
+        except Exception as exc:
+            log.error("Failed starting %s: %s", self.name, exc)
+            return
+        try:
+            while True:
+                item = await self.queue.get()
                 if item is None:
                     break
-                log.debug("Sending %s Notification", self.name)
-                self._send(item)
-            except KeyboardInterrupt:
-                pass
-            except Exception as exc:
+                if isinstance(item, Item) and self.batch_window > 0 and self.batch_size > 1:
+                    items = await self._collect_batch(item)
+                else:
+                    items = [item]
+                for entry in items:
+                    if entry is None:
+                        return
+                    log.debug("Sending %s Notification", self.name)
+                    await self._attempt(entry)
+        finally:
+            # Pending retries are written to the dead letter file
+            for task in self._retry_tasks:
+                task.cancel()
+            await asyncio.gather(*self._retry_tasks, return_exceptions=True)
+            await self._teardown()
+
+    async def _attempt(self, item: Item | ItemBatch | Reservation, attempt: int = 1, error: Exception | None = None) -> None:
+        """Sends the item and schedules a retry if sending fails."""
+        try:
+            if error is None:
+                await self._deliver(item)
+            else:
+                await self._redeliver(item, error)
+        except Exception as exc:
+            if attempt > self.retries or isinstance(exc, ConfigurationError):
                 log.error("Failed sending %s: %s", self.name, exc)
+                self.dead_letters.add(self.name, item, exc, attempt)
+                return
+            task = asyncio.create_task(self._retry(item, exc, attempt))
+            self._retry_tasks.add(task)
+            task.add_done_callback(self._retry_tasks.discard)
+
+    async def _retry(self, item: Item | ItemBatch | Reservation, error: Exception, attempt: int) -> None:
+        """Retries the item after an exponential backoff with jitter."""
+        delay = min(self.retry_delay * 2 ** (attempt - 1), MAX_RETRY_DELAY) * random.uniform(0.5, 1)
+        log.warning("Failed sending %s: %s - Retrying in %.1f seconds", self.name, error, delay)
+        try:
+            await asyncio.sleep(delay)
+            await self._attempt(item, attempt + 1, error)
+        except asyncio.CancelledError:
+            self.dead_letters.add(self.name, item, error, attempt)
+            raise
+
+    async def _collect_batch(self, first: Item) -> list[Item | ItemBatch | Reservation | None]:
+        """Collects the items arriving within the batch window.
+
+        Returns:
+            list: The batch followed by reservations and a stop signal received meanwhile
 
-    def start(self) -> None:
-        """Run notifier in thread."""
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.batch_window / 1000
+        items = [first]
+        others: list[Reservation | None] = []
+        while len(items) < self.batch_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                item = await asyncio.wait_for(self.queue.get(), timeout)
+            except asyncio.TimeoutError:
+                break
+            if isinstance(item, Item):
+                items.append(item)
+                continue
+            others.append(item)
+            if item is None:
+                break
+        batch = ItemBatch(items, self.batch_body) if len(items) > 1 else first
+        return [batch, *others]
+
+    def _unmask_body(self, item: Item | ItemBatch, body: str, escape: Callable[[str], str] | None = None) -> str:
+        """Renders the notification body of an item or the digest of a batch."""
+        if isinstance(item, ItemBatch):
+            return item.digest(body, escape, self.batch_separator)
+        return item.unmask(body, escape)
+
+    async def _deliver(self, item: Item | ItemBatch | Reservation) -> None:
+        if inspect.iscoroutinefunction(self._send):
+            await cast(Awaitable[None], self._send(item))
+        elif self.dispatcher is not None:
+            await self.dispatcher.run_sync(self._send, item)
+
+    async def _run_sync(self, func: Callable[..., T], *args: Any) -> T:
+        """Calls a blocking function, like a TGTG API request, without blocking the event loop."""
+        if self.dispatcher is not None:
+            return await self.dispatcher.run_sync(func, *args)
+        return await asyncio.to_thread(func, *args)
+
+    async def _redeliver(self, item: Item | ItemBatch | Reservation, error: Exception) -> None:
+        """Sends the item again after it failed with the error.
+
+        Notifiers sending to several recipients can override this to only
+        retry the recipients that failed.
+        """
+        await self._deliver(item)
+
+    async def _setup(self) -> None:  # noqa: B027
+        """Prepares the notifier on the event loop before the first item is sent."""
+
+    async def _teardown(self) -> None:  # noqa: B027
+        """Cleans up the notifier on the event loop after it was stopped."""
+
+    def start(self, dispatcher: Dispatcher | None = None) -> None:
+        """Run notifier on the event loop of the dispatcher.
+
+        Args:
+            dispatcher (Dispatcher, optional): Shared dispatcher. Defaults to a dispatcher of its own.
+
+        """
         if self.enabled:
-            log.debug("Starting %s Notifier thread", self.name)
-            self.thread.start()
+            log.debug("Starting %s Notifier", self.name)
+            if dispatcher is None:
+                dispatcher = Dispatcher(max_workers=1)
+                self._own_dispatcher = True
+            dispatcher.start()
+            self.dispatcher = dispatcher
+            if dispatcher.loop is not None:
+                self.queue.bind(dispatcher.loop)
+            self.task = dispatcher.submit(self._run())
 
     def send(self, item: Item | Reservation) -> None:
         """Send notification."""
@@ -54,23 +213,33 @@ class Notifier(ABC):
             log.error("Invalid item type: %s", type(item))
             return
         if self.enabled and self.cron.is_now:
+            # Items sent before start are buffered
             self.queue.put(item)
-            if not self.thread.is_alive():
-                log.debug("%s Notifier thread is dead. Restarting", self.name)
-                self.thread = threading.Thread(target=self._run)
-                self.start()
+            if self.dispatcher is not None and self.task is not None and self.task.done():
+                log.debug("%s Notifier is dead. Restarting", self.name)
+                self.task = self.dispatcher.submit(self._run())
 
     @abstractmethod
-    def _send(self, item: Item | Reservation) -> None:
-        """Send Item information."""
+    def _send(self, item: Item | ItemBatch | Reservation) -> Awaitable[None] | None:
+        """Send Item information.
+
+        Implemented either as coroutine or as blocking function.
+        """
 
     def stop(self) -> None:
         """Stop notifier."""
-        if self.thread.is_alive():
-            log.debug("Stopping %s Notifier thread", self.name)
+        if self.dispatcher is None or self.dispatcher.loop is None:
+            return
+        if self.task is not None and not self.task.done():
+            log.debug("Stopping %s Notifier", self.name)
             self.queue.put(None)
-            self.thread.join()
-            log.debug("%s Notifier thread stopped", self.name)
+            self.task.result()
+            log.debug("%s Notifier stopped", self.name)
+        self.queue.unbind()
+        if self._own_dispatcher:
+            self.dispatcher.stop()
+            self.dispatcher = None
+            self._own_dispatcher = False
 
     @abstractmethod
     def __repr__(self) -> str:
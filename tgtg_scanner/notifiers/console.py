@@ -1,7 +1,7 @@
 import logging
 
 from tgtg_scanner.errors import ConsoleConfigurationError, MaskConfigurationError
-from tgtg_scanner.models import Config, Favorites, Item, Reservations
+from tgtg_scanner.models import Config, Favorites, Item, ItemBatch, Reservations
 from tgtg_scanner.models.reservations import Reservation
 from tgtg_scanner.notifiers.base import Notifier
 
@@ -15,7 +15,7 @@ class Console(Notifier):
         super().__init__(config, reservations, favorites)
         self.enabled = config.console.enabled
         self.body = config.console.body
-        self.cron = config.console.cron
+        self._apply_config(config.console)
 
         if self.enabled:
             try:
@@ -23,9 +23,9 @@ class Console(Notifier):
             except MaskConfigurationError as exc:
                 raise ConsoleConfigurationError(exc.message) from exc
 
-    def _send(self, item: Item | Reservation) -> None:
-        if isinstance(item, Item):
-            message = item.unmask(self.body)
+    def _send(self, item: Item | ItemBatch | Reservation) -> None:
+        if isinstance(item, (Item, ItemBatch)):
+            message = self._unmask_body(item, self.body)
             print(message)
 
     def __repr__(self) -> str:
@@ -0,0 +1,56 @@
+import datetime
+import json
+import logging
+import threading
+from dataclasses import asdict
+from pathlib import Path
+
+from tgtg_scanner.models import Item, ItemBatch
+from tgtg_scanner.models.reservations import Reservation
+
+log = logging.getLogger("tgtg")
+
+DEAD_LETTERS_FILE = "notifierDeadLetters.jsonl"
+
+
+class DeadLetters:
+    """Appends permanently failed notifications to a JSON Lines file.
+
+    Each line holds the notifier, the error, the number of attempts and the
+    raw item data, so failed notifications can be inspected or replayed.
+    """
+
+    _lock = threading.Lock()
+
+    def __init__(self, path: str | None):
+        """
+        Args:
+            path (str): Directory of the file, None only logs failed notifications
+
+        """
+        self.file = Path(path, DEAD_LETTERS_FILE) if path else None
+
+    def add(self, notifier: str, item: Item | ItemBatch | Reservation, error: Exception, attempts: int) -> None:
+        """Records a failed notification."""
+        if self.file is None:
+            return
+        entry = {
+            "time": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "notifier": notifier,
+            "error": f"{type(error).__name__}: {error}",
+            "attempts": attempts,
+            **self._serialize(item),
+        }
+        try:
+            with DeadLetters._lock, open(self.file, "a", encoding="utf-8") as file:
+                file.write(json.dumps(entry, ensure_ascii=False, default=str) + "\n")
+        except OSError as err:
+            log.warning("Failed to write dead letter - %s", err)
+
+    @staticmethod
+    def _serialize(item: Item | ItemBatch | Reservation) -> dict:
+        if isinstance(item, ItemBatch):
+            return {"items": [batch_item.data for batch_item in item.items]}
+        if isinstance(item, Item):
+            return {"item": item.data}
+        return {"reservation": asdict(item)}
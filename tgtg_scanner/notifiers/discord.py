@@ -1,18 +1,19 @@
 import asyncio
 import datetime
 import logging
-from queue import Empty
 
 import discord
-from discord.ext import commands, tasks
+from discord.ext import commands
 
 from tgtg_scanner.errors import DiscordConfigurationError, MaskConfigurationError
-from tgtg_scanner.models import Config, Favorites, Item, Reservations
+from tgtg_scanner.models import Config, Favorites, Item, ItemBatch, Reservations
 from tgtg_scanner.models.reservations import Reservation
 from tgtg_scanner.notifiers.base import Notifier
 
 log = logging.getLogger("tgtg")
 
+READY_TIMEOUT = 60  # Seconds
+
 discord.VoiceClient.warn_nacl = False
 
 
@@ -27,11 +28,13 @@ class Discord(Notifier):
         self.channel = config.discord.channel
         self.body = config.discord.body
         self.disable_commands = config.discord.disable_commands
-        self.cron = config.discord.cron
+        self._apply_config(config.discord)
         self.mute: datetime.datetime | None = None
         self.bot_id = None
         self.channel_id = None
         self.server_id = None
+        self._ready = asyncio.Event()
+        self._bot_task: asyncio.Task | None = None
 
         if self.enabled:
             if self.token is None or self.channel == 0:
@@ -50,44 +53,40 @@ class Discord(Notifier):
             except MaskConfigurationError as exc:
                 raise DiscordConfigurationError(exc.message) from exc
 
-    async def _send(self, item: Item | Reservation) -> None:  # type: ignore[override]
+    async def _send(self, item: Item | ItemBatch | Reservation) -> None:
         """Sends item information using Discord bot."""
         if self.mute and self.mute > datetime.datetime.now():
             return
         if self.mute:
             log.info("Reactivated Discord Notifications")
             self.mute = None
-        if isinstance(item, Item):
-            message = item.unmask(self.body)
-            self.bot.dispatch("send_notification", message)
-
-    @tasks.loop(seconds=1)
-    async def _listen_for_items(self):
-        """Method for polling notifications every second."""
-        try:
-            item = self.queue.get(block=False)
-            if item is None:
-                self.bot.dispatch("close")
-                return
-            log.debug("Sending %s Notification", self.name)
-            await self._send(item)
-        except Empty:
-            pass
-        except Exception as exc:
-            log.error("Failed sending %s: %s", self.name, exc)
-
-    def _run(self):
-        self.config.set_locale()
-        # Setting event loop explicitly for python 3.9 compatibility
-        loop = asyncio.new_event_loop()
-        asyncio.set_event_loop(loop)
+        if isinstance(item, (Item, ItemBatch)):
+            message = self._unmask_body(item, self.body)
+            # Following notifications stay in the queue until the bot is connected
+            await asyncio.wait_for(self._ready.wait(), READY_TIMEOUT)
+            await self._send_message(message)
+
+    async def _send_message(self, message: str) -> None:
+        """Sends the message to the configured channel."""
+        channel = self.bot.get_channel(self.channel) or await self.bot.fetch_channel(self.channel)
+        if not isinstance(channel, discord.abc.Messageable):
+            raise DiscordConfigurationError(f"Channel {self.channel} does not accept messages")
+        await channel.send(message)
+
+    async def _setup(self) -> None:
+        self._ready.clear()
         self.bot = commands.Bot(command_prefix=self.prefix, intents=discord.Intents.all())
-        # Events include methods for post-init, shutting down, and notification sending
+        # Events include methods for post-init and notification sending
         self._setup_events()
         if not self.disable_commands:
             # Commands are handled separately, in case commands are not enabled
             self._setup_commands()
-        asyncio.run(self._start_bot())
+        self._bot_task = asyncio.create_task(self._start_bot())
+
+    async def _teardown(self) -> None:
+        await self.bot.close()
+        if self._bot_task is not None:
+            await asyncio.gather(self._bot_task, return_exceptions=True)
 
     async def _start_bot(self):
         async with self.bot:
@@ -100,19 +99,7 @@ class Discord(Notifier):
             self.bot_id = self.bot.user.id
             self.channel_id = self.channel
             self.server_id = self.bot.guilds[0].id if len(self.bot.guilds) > 0 else 0
-            self._listen_for_items.start()
-
-        @self.bot.event
-        async def on_send_notification(message):
-            """Callback for item notification."""
-            channel = self.bot.get_channel(self.channel) or await self.bot.fetch_channel(self.channel)
-            if channel:
-                await channel.send(message)
-
-        @self.bot.event
-        async def on_close():
-            """Logout from Discord (only explicitly used in test_notifiers.py)."""
-            await self.bot.close()
+            self._ready.set()
 
     def _setup_commands(self):
         @self.bot.command(name="mute")
@@ -136,7 +123,7 @@ class Discord(Notifier):
         @self.bot.command(name="listfavorites")
         async def _list_favorites(ctx):
             """List favorites using display name."""
-            favorites = self.favorites.get_favorites()
+            favorites = await self._run_sync(self.favorites.get_favorites)
             if not favorites:
                 await ctx.send("You currently don't have any favorites.")
             else:
@@ -145,7 +132,7 @@ class Discord(Notifier):
         @self.bot.command(name="listfavoriteids")
         async def _list_favorite_ids(ctx):
             """List favorites using id."""
-            favorites = self.favorites.get_favorites()
+            favorites = await self._run_sync(self.favorites.get_favorites)
             if not favorites:
                 await ctx.send("You currently don't have any favorites.")
             else:
@@ -171,7 +158,7 @@ class Discord(Notifier):
                 )
                 return
 
-            self.favorites.add_favorites(item_ids)
+            await self._run_sync(self.favorites.add_favorites, item_ids)
             await ctx.send(f"Added the following item ids to favorites: {' '.join(item_ids)}")
             log.debug('Added the following item ids to favorites: "%s"', item_ids)
 
@@ -195,7 +182,7 @@ class Discord(Notifier):
                 )
                 return
 
-            self.favorites.remove_favorite(item_ids)
+            await self._run_sync(self.favorites.remove_favorite, item_ids)
             await ctx.send(f"Removed the following item ids from favorites: {' '.join(item_ids)}")
             log.debug('Removed the following item ids from favorites: "%s"', item_ids)
 
@@ -0,0 +1,81 @@
+import asyncio
+import concurrent.futures
+import logging
+import threading
+from collections.abc import Callable, Coroutine
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, TypeVar
+
+log = logging.getLogger("tgtg")
+
+T = TypeVar("T")
+
+
+class Dispatcher:
+    """Runs all notifiers on a single asyncio event loop in a background thread.
+
+    Async notifiers run as coroutines on the loop. Sync notifiers are called
+    in a thread pool, so a slow notifier never blocks the others.
+    """
+
+    def __init__(self, max_workers: int = 8):
+        """
+        Args:
+            max_workers (int): Max threads for sync notifiers
+
+        """
+        self.max_workers = max_workers
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.executor: ThreadPoolExecutor | None = None
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Starts the event loop thread."""
+        with self._lock:
+            if self.running:
+                return
+            self.loop = asyncio.new_event_loop()
+            self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="tgtg-notifier")
+            self._thread = threading.Thread(target=self._run_loop, args=(self.loop,), name="tgtg-notifiers", daemon=True)
+            self._thread.start()
+
+    def _run_loop(self, loop: asyncio.AbstractEventLoop) -> None:
+        asyncio.set_event_loop(loop)
+        try:
+            loop.run_forever()
+            # Let cancelled tasks clean up before the loop is closed
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.run_until_complete(loop.shutdown_asyncgens())
+        finally:
+            loop.close()
+
+    def submit(self, coro: Coroutine[Any, Any, T]) -> concurrent.futures.Future[T]:
+        """Schedules a coroutine on the event loop from any thread."""
+        if self.loop is None:
+            raise RuntimeError("Dispatcher not started!")
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    async def run_sync(self, func: Callable[..., T], *args: Any) -> T:
+        """Calls a blocking function in the thread pool and waits for the result."""
+        return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+
+    def stop(self) -> None:
+        """Stops the event loop and waits for running sync notifiers."""
+        with self._lock:
+            if self.loop is None or self._thread is None:
+                return
+            if self.running:
+                self.loop.call_soon_threadsafe(self.loop.stop)
+                self._thread.join()
+            if self.executor is not None:
+                self.executor.shutdown(wait=True)
+            self.loop = None
+            self._thread = None
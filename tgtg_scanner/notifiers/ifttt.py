@@ -19,7 +19,7 @@ class IFTTT(WebHook):
         self.event = config.ifttt.event
         self.key = config.ifttt.key
         self.body = config.ifttt.body
-        self.cron = config.ifttt.cron
+        self._apply_config(config.ifttt)
         self.timeout = config.ifttt.timeout
         self.headers = {}
         self.method = "POST"
@@ -0,0 +1,149 @@
+import asyncio
+import threading
+from collections import Counter, deque
+from collections.abc import Callable
+from time import monotonic
+from typing import Generic, TypeVar
+
+from tgtg_scanner.models.config import QUEUE_POLICIES, NotifierConfig
+
+T = TypeVar("T")
+
+# Producers are scanner threads, which may hold the state lock while they wait
+BLOCK_TIMEOUT = 5  # Seconds
+
+
+class NotificationQueue(Generic[T]):
+    """Bounded queue that hands notifications from any thread to a coroutine on an event loop.
+
+    `put` appends the item and wakes the waiting consumer with
+    `call_soon_threadsafe`. Idle consumers wait without any wakeups. Items put
+    before the queue is bound to a loop stay queued until the next start.
+
+    When the queue is full, the policy decides:
+      - drop_oldest: discards the oldest queued item
+      - drop_stale: discards expired items, or the new item if none expired
+      - block: waits for free space while the consumer is running, at most
+        `block_timeout` or `max_age` seconds, then discards the new item
+
+    Items older than `max_age` seconds are discarded instead of delivered.
+    None is used as stop signal and is never bounded or discarded.
+    """
+
+    def __init__(self, maxsize: int = 100, policy: str = "drop_oldest", max_age: float = 0, block_timeout: float = BLOCK_TIMEOUT):
+        """
+        Args:
+            maxsize (int): Max queued items, 0 for unbounded
+            policy (str): Overflow policy, one of QUEUE_POLICIES
+            max_age (float): Seconds until queued items expire, 0 to disable
+            block_timeout (float): Max seconds the block policy waits for free space
+
+        """
+        if policy not in QUEUE_POLICIES:
+            raise ValueError(f"Invalid queue policy {policy}")
+        self.maxsize = maxsize
+        self.policy = policy
+        self.max_age = max_age
+        self.block_timeout = block_timeout
+        self.dropped: Counter[str] = Counter()
+        self.on_drop: Callable[[str], None] | None = None
+        self._items: deque[tuple[float, T | None]] = deque()
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._event: asyncio.Event | None = None
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+
+    @classmethod
+    def from_config(cls, config: NotifierConfig) -> "NotificationQueue":
+        return cls(config.queue_size, config.queue_policy, config.queue_max_age)
+
+    def bind(self, loop: asyncio.AbstractEventLoop) -> None:
+        """Binds the queue to the event loop of the consumer."""
+        with self._lock:
+            self._loop = loop
+            self._event = asyncio.Event()
+            self._wakeup()
+
+    def unbind(self) -> None:
+        """Detaches the stopped consumer and releases blocked producers."""
+        with self._lock:
+            self._loop = None
+            self._event = None
+            self._not_full.notify_all()
+
+    def put(self, item: T | None) -> None:
+        """Adds an item. Can be called from any thread."""
+        with self._lock:
+            if item is not None and not self._make_room():
+                self._drop("overflow")
+                return
+            self._items.append((monotonic(), item))
+            self._wakeup()
+
+    async def get(self) -> T | None:
+        """Waits for the next item. Must be called on the bound event loop."""
+        while True:
+            event = self._event
+            if event is None:
+                raise RuntimeError("Queue is not bound to an event loop!")
+            event.clear()
+            with self._lock:
+                self._drop_expired()
+                if self._items:
+                    _, item = self._items.popleft()
+                    self._not_full.notify()
+                    return item
+            await event.wait()
+
+    def qsize(self) -> int:
+        """Number of queued items."""
+        return len(self._items)
+
+    def _full(self) -> bool:
+        return self.maxsize > 0 and len(self._items) >= self.maxsize
+
+    def _make_room(self) -> bool:
+        """Frees space for a new item according to the policy.
+
+        Returns:
+            bool: False if the new item has to be discarded
+
+        """
+        if not self._full():
+            return True
+        if self.policy == "block":
+            wait = min(self.block_timeout, self.max_age) if self.max_age > 0 else self.block_timeout
+            deadline = monotonic() + wait
+            # Only wait while a consumer frees space
+            while self._full() and self._loop is not None:
+                timeout = deadline - monotonic()
+                if timeout <= 0:
+                    return False
+                self._not_full.wait(timeout)
+            if not self._full():
+                return True
+        elif self.policy == "drop_stale":
+            self._drop_expired()
+            return not self._full()
+        while self._full() and self._items[0][1] is not None:
+            self._items.popleft()
+            self._drop("overflow")
+        return not self._full()
+
+    def _drop_expired(self) -> None:
+        if self.max_age <= 0:
+            return
+        deadline = monotonic() - self.max_age
+        # Items are queued in order, so expired items are at the front
+        while self._items and self._items[0][1] is not None and self._items[0][0] < deadline:
+            self._items.popleft()
+            self._drop("expired")
+
+    def _drop(self, reason: str) -> None:
+        self.dropped[reason] += 1
+        if self.on_drop is not None:
+            self.on_drop(reason)
+
+    def _wakeup(self) -> None:
+        if self._items and self._loop is not None and self._event is not None and not self._loop.is_closed():
+            self._loop.call_soon_threadsafe(self._event.set)
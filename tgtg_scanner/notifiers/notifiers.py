@@ -1,11 +1,13 @@
 import logging
+from functools import partial
 
-from tgtg_scanner.models import Config, Cron, Favorites, Item, Reservations
+from tgtg_scanner.models import Config, Cron, Favorites, Item, Metrics, Reservations
 from tgtg_scanner.models.reservations import Reservation
 from tgtg_scanner.notifiers.apprise import Apprise
 from tgtg_scanner.notifiers.base import Notifier
 from tgtg_scanner.notifiers.console import Console
 from tgtg_scanner.notifiers.discord import Discord
+from tgtg_scanner.notifiers.dispatcher import Dispatcher
 from tgtg_scanner.notifiers.ifttt import IFTTT
 from tgtg_scanner.notifiers.ntfy import Ntfy
 from tgtg_scanner.notifiers.push_safer import PushSafer
@@ -20,10 +22,14 @@ NOTIFIERS: list[type[Notifier]] = [Apprise, Console, PushSafer, SMTP, IFTTT, Ntf
 
 
 class Notifiers:
-    """Notifier Manager."""
+    """Notifier Manager.
+
+    All notifiers share one dispatcher, so they run on one event loop.
+    """
 
     def __init__(self, config: Config, reservations: Reservations, favorites: Favorites):
         self._notifiers: list[Notifier] = [NotifierCls(config, reservations, favorites) for NotifierCls in NOTIFIERS]
+        self.dispatcher = Dispatcher(max_workers=len(NOTIFIERS))
         log.info("Activated notifiers:")
         if self.notifier_count == 0:
             log.warning("No notifiers configured!")
@@ -46,6 +52,12 @@ class Notifiers:
         """
         return len(self._enabled_notifiers)
 
+    def watch_queues(self, metrics: Metrics) -> None:
+        """Export queue depth and dropped notifications of the enabled notifiers."""
+        for notifier in self._enabled_notifiers:
+            metrics.notifier_queue_depth.labels(notifier.name).set_function(notifier.queue.qsize)
+            notifier.queue.on_drop = partial(metrics.count_dropped_notification, notifier.name)
+
     def send(self, item: Item | Reservation) -> None:
         """Send notifications on all enabled notifiers.
 
@@ -58,9 +70,9 @@ class Notifiers:
 
     def start(self) -> None:
         """Start all notifiers."""
-        for notifier in self._notifiers:
+        for notifier in self._enabled_notifiers:
             try:
-                notifier.start()
+                notifier.start(self.dispatcher)
             except Exception as exc:
                 log.warning("Error starting %s - %s", notifier, exc)
 
@@ -71,3 +83,4 @@ class Notifiers:
                 notifier.stop()
             except Exception as exc:
                 log.warning("Error stopping %s - %s", notifier, exc)
+        self.dispatcher.stop()
@@ -3,7 +3,7 @@ import logging
 from requests.auth import HTTPBasicAuth
 
 from tgtg_scanner.errors import MaskConfigurationError, NtfyConfigurationError
-from tgtg_scanner.models import Config, Favorites, Item, Reservations
+from tgtg_scanner.models import Config, Favorites, Item, ItemBatch, Reservations
 from tgtg_scanner.models.reservations import Reservation
 from tgtg_scanner.notifiers.webhook import WebHook
 
@@ -28,7 +28,7 @@ class Ntfy(WebHook):
         self.password = config.ntfy.password
         self.token = config.ntfy.token
         self.timeout = config.ntfy.timeout
-        self.cron = config.ntfy.cron
+        self._apply_config(config.ntfy)
         self.headers = dict()
         self.auth = None
         self.method = "POST"
@@ -57,11 +57,11 @@ class Ntfy(WebHook):
             except MaskConfigurationError as exc:
                 raise NtfyConfigurationError(exc.message) from exc
 
-    def _send(self, item: Item | Reservation) -> None:
+    def _send(self, item: Item | ItemBatch | Reservation) -> None:
         """Sends item information via configured Ntfy endpoint."""
-        if isinstance(item, Item):
+        if isinstance(item, (Item, ItemBatch)):
             title = item.unmask(self.title).encode("utf-8")
-            message = item.unmask(self.message).encode("utf-8")
+            message = self._unmask_body(item, self.message).encode("utf-8")
             tags = item.unmask(self.tags).encode("utf-8")
             click = item.unmask(self.click).encode("utf-8")
             self.headers |= {
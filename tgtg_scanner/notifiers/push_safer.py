@@ -3,7 +3,7 @@ import logging
 from pushsafer import Client
 
 from tgtg_scanner.errors import PushSaferConfigurationError
-from tgtg_scanner.models import Config, Favorites, Item, Reservations
+from tgtg_scanner.models import Config, Favorites, Item, ItemBatch, Reservations
 from tgtg_scanner.models.reservations import Reservation
 from tgtg_scanner.notifiers.base import Notifier
 
@@ -21,13 +21,13 @@ class PushSafer(Notifier):
         self.enabled = config.pushsafer.enabled
         self.key = config.pushsafer.key
         self.device_ids = config.pushsafer.device_ids
-        self.cron = config.pushsafer.cron
+        self._apply_config(config.pushsafer)
         if self.enabled:
             if self.key is None or len(self.device_ids) == 0:
                 raise PushSaferConfigurationError()
             self.client = Client(self.key)
 
-    def _send(self, item: Item | Reservation) -> None:
+    def _send(self, item: Item | ItemBatch | Reservation) -> None:
         """Sends item information to the Pushsafer endpoint."""
         if isinstance(item, Item):
             message = f"New Amount: {item.items_available}"
@@ -2,7 +2,7 @@ import logging
 import subprocess
 
 from tgtg_scanner.errors import MaskConfigurationError, ScriptConfigurationError
-from tgtg_scanner.models import Config, Favorites, Item, Reservations
+from tgtg_scanner.models import Config, Favorites, Item, ItemBatch, Reservations
 from tgtg_scanner.models.reservations import Reservation
 from tgtg_scanner.notifiers import Notifier
 
@@ -16,7 +16,7 @@ class Script(Notifier):
         super().__init__(config, reservations, favorites)
         self.enabled = config.script.enabled
         self.command = config.script.command
-        self.cron = config.script.cron
+        self._apply_config(config.script)
 
         if self.enabled:
             if self.command is None:
@@ -26,7 +26,7 @@ class Script(Notifier):
             except MaskConfigurationError as exc:
                 raise ScriptConfigurationError(exc.message) from exc
 
-    def _send(self, item: Item | Reservation) -> None:
+    def _send(self, item: Item | ItemBatch | Reservation) -> None:
         if self.command is None:
             raise ScriptConfigurationError()
         if isinstance(item, Item):
@@ -7,7 +7,7 @@ from email.utils import formatdate
 from smtplib import SMTPException, SMTPServerDisconnected
 
 from tgtg_scanner.errors import MaskConfigurationError, SMTPConfigurationError
-from tgtg_scanner.models import Config, Favorites, Item, Reservations
+from tgtg_scanner.models import Config, Favorites, Item, ItemBatch, Reservations
 from tgtg_scanner.models.reservations import Reservation
 from tgtg_scanner.notifiers.base import Notifier
 
@@ -34,7 +34,7 @@ class SMTP(Notifier):
         self.item_recipients: dict[str, list[str]] = {}
         self.subject = config.smtp.subject
         self.body = config.smtp.body
-        self.cron = config.smtp.cron
+        self._apply_config(config.smtp)
         if self.enabled:
             if self.host is None or self.port is None or self.recipients is None:
                 raise SMTPConfigurationError()
@@ -118,10 +118,10 @@ class SMTP(Notifier):
             self._connect()
             self.server.sendmail(self.sender, recipients, body)
 
-    def _send(self, item: Item | Reservation) -> None:
+    def _send(self, item: Item | ItemBatch | Reservation) -> None:
         """Sends item information via Mail."""
-        if isinstance(item, Item):
-            self._send_mail(item.unmask(self.subject), item.unmask(self.body), item.item_id)
+        if isinstance(item, (Item, ItemBatch)):
+            self._send_mail(item.unmask(self.subject), self._unmask_body(item, self.body), item.item_id)
 
     def __repr__(self) -> str:
         return f"SMTP: {self.recipients}"
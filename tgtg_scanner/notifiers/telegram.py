@@ -5,8 +5,7 @@ import datetime
 import logging
 import random
 import warnings
-from functools import wraps
-from queue import Empty
+from functools import partial, wraps
 from time import sleep
 
 from telegram import BotCommand, InlineKeyboardButton, InlineKeyboardMarkup, Update
@@ -31,10 +30,11 @@ from telegram.helpers import escape_markdown
 from telegram.warnings import PTBUserWarning
 
 from tgtg_scanner.errors import MaskConfigurationError, TelegramConfigurationError
-from tgtg_scanner.models import Config, Favorites, Item, Reservations
+from tgtg_scanner.models import Config, Favorites, Item, ItemBatch, Reservations
 from tgtg_scanner.models.favorites import AddFavoriteRequest, RemoveFavoriteRequest
 from tgtg_scanner.models.reservations import Order, Reservation
 from tgtg_scanner.notifiers.base import Notifier
+from tgtg_scanner.notifiers.dispatcher import Dispatcher
 
 log = logging.getLogger("tgtg")
 
@@ -53,11 +53,22 @@ def _private(func):
     return wrapper
 
 
+class _ChatsFailed(Exception):
+    """Network error while sending a message to some chats.
+
+    Keeps the message and the failed chats, so only these are retried.
+    """
+
+    def __init__(self, error: TelegramError, message: str, image: bytes | None, chat_ids: list[str]):
+        super().__init__(f"{error} (chats {', '.join(chat_ids)})")
+        self.message = message
+        self.image = image
+        self.chat_ids = chat_ids
+
+
 class Telegram(Notifier):
     """Notifier for Telegram."""
 
-    MAX_RETRIES = 10
-
     def __init__(self, config: Config, reservations: Reservations, favorites: Favorites):
         super().__init__(config, reservations, favorites)
         self.application: Application = None
@@ -70,9 +81,8 @@ class Telegram(Notifier):
         self.timeout = config.telegram.timeout
         self.disable_commands = config.telegram.disable_commands
         self.only_reservations = config.telegram.only_reservations
-        self.cron = config.telegram.cron
+        self._apply_config(config.telegram)
         self.mute: datetime.datetime | None = None
-        self.retries = 0
         if self.enabled:
             if not self.token or not self.body:
                 raise TelegramConfigurationError()
@@ -151,62 +161,34 @@ class Telegram(Notifier):
         await self.application.stop()
         await self.application.shutdown()
 
-    def start(self) -> None:
+    def start(self, dispatcher: Dispatcher | None = None) -> None:
         if self.enabled and not self.chat_ids:
             asyncio.run(self._get_chat_id())
-        super().start()
-
-    def _run(self) -> None:
-        async def _listen_for_items() -> None:
-            # Setting event loop explicitly for python 3.9 compatibility
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            self.application = ApplicationBuilder().token(self.token).arbitrary_callback_data(True).build()
-            self.application.add_error_handler(self._error)
-            await self.application.bot.set_my_commands([])
-            if not self.disable_commands:
-                try:
-                    await self._start_polling()
-                except Exception as exc:
-                    log.error("Telegram failed starting polling: %s", exc)
-                    return
-            while True:
-                try:
-                    item = self.queue.get(block=False)
-                    if item is None:
-                        break
-                    log.debug("Sending %s Notification", self.name)
-                    await self._send(item)
-                except Empty:
-                    pass
-                except Exception as exc:
-                    log.error("Failed sending %s: %s", self.name, exc)
-                finally:
-                    await asyncio.sleep(0.1)
-            if not self.disable_commands:
-                try:
-                    await self._stop_polling()
-                except Exception as exc:
-                    log.warning("Telegram failed stopping polling: %s", exc)
-
-        self.config.set_locale()
-        asyncio.run(_listen_for_items())
-
-    def _unmask(self, text: str, item: Item) -> str:
-        for match in item._get_variables(text):
-            if hasattr(item, match.group(1)):
-                val = str(getattr(item, match.group(1)))
-                val = escape_markdown(val, version=2)
-                text = text.replace(match.group(0), val)
-        return text
+        super().start(dispatcher)
+
+    async def _setup(self) -> None:
+        self.application = ApplicationBuilder().token(self.token).arbitrary_callback_data(True).build()  # type: ignore[arg-type]
+        self.application.add_error_handler(self._error)
+        await self.application.bot.set_my_commands([])
+        if not self.disable_commands:
+            await self._start_polling()
+
+    async def _teardown(self) -> None:
+        if not self.disable_commands:
+            try:
+                await self._stop_polling()
+            except Exception as exc:
+                log.warning("Telegram failed stopping polling: %s", exc)
+
+    def _unmask(self, text: str, item: Item | ItemBatch) -> str:
+        return self._unmask_body(item, text, partial(escape_markdown, version=2))
 
     def _unmask_image(self, text: str, item: Item) -> bytes | None:
         if text in ["${{item_logo_bytes}}", "${{item_cover_bytes}}"]:
-            matches = item._get_variables(text)
-            return bytes(getattr(item, matches[0].group(1)))
+            return getattr(item, text[3:-2])
         return None
 
-    async def _send(self, item: Item | Reservation) -> None:  # type: ignore[override]
+    async def _send(self, item: Item | ItemBatch | Reservation) -> None:
         """Send item information as Telegram message.
 
         Reservation notifications are always send.
@@ -216,9 +198,10 @@ class Telegram(Notifier):
             log.info("Reactivated Telegram Notifications")
             self.mute = None
         image = None
-        if isinstance(item, Item) and not self.only_reservations and not self.mute:
+        if isinstance(item, (Item, ItemBatch)) and not self.only_reservations and not self.mute:
             message = self._unmask(self.body, item)
-            if self.image:
+            # Digests are sent without image
+            if self.image and isinstance(item, Item):
                 image = self._unmask_image(self.image, item)
         elif isinstance(item, Reservation):
             message = escape_markdown(f"{item.display_name} is reserved for 5 minutes", version=2)
@@ -226,10 +209,23 @@ class Telegram(Notifier):
             return
         await self._send_message(message, image)
 
-    async def _send_message(self, message: str, image: bytes | None = None) -> None:
+    async def _redeliver(self, item: Item | ItemBatch | Reservation, error: Exception) -> None:
+        if isinstance(error, _ChatsFailed):
+            await self._send_message(error.message, error.image, error.chat_ids)
+        else:
+            await super()._redeliver(item, error)
+
+    async def _send_message(self, message: str, image: bytes | None = None, chat_ids: list[str] | None = None) -> None:
+        """Sends the message to all chats or the given chats.
+
+        Raises _ChatsFailed after all chats were tried if there were network
+        errors, so the notifier retries the message for the failed chats.
+        """
         log.debug("%s message: %s", self.name, message)
         fmt = ParseMode.MARKDOWN_V2
-        for chat_id in self.chat_ids:
+        network_error: NetworkError | None = None
+        failed_chat_ids: list[str] = []
+        for chat_id in self.chat_ids if chat_ids is None else chat_ids:
             try:
                 if image:
                     await self.application.bot.send_photo(chat_id=chat_id, photo=image, caption=message, parse_mode=fmt)
@@ -240,7 +236,6 @@ class Telegram(Notifier):
                         parse_mode=fmt,
                         disable_web_page_preview=True,
                     )
-                self.retries = 0
             except BadRequest as err:
                 err_message = err.message
                 if err_message.startswith("Can't parse entities:"):
@@ -248,12 +243,12 @@ class Telegram(Notifier):
                 log.error("Telegram Error: %s", err_message)
             except (NetworkError, TimedOut) as err:
                 log.warning("Telegram Error: %s", err)
-                self.retries += 1
-                if self.retries > Telegram.MAX_RETRIES:
-                    raise err
-                await self._send_message(message)
+                network_error = network_error or err
+                failed_chat_ids.append(chat_id)
             except TelegramError as err:
                 log.error("Telegram Error: %s", err)
+        if network_error is not None:
+            raise _ChatsFailed(network_error, message, image, failed_chat_ids) from network_error
 
     def _is_my_chat(self, update: Update) -> bool:
         return str(update.message.chat.id) in self.chat_ids
@@ -281,7 +276,7 @@ class Telegram(Notifier):
 
     @_private
     async def _reserve_item_menu(self, update: Update, _) -> None:
-        favorites = self.favorites.get_favorites()
+        favorites = await self._run_sync(self.favorites.get_favorites)
         buttons = [
             [InlineKeyboardButton(f"{item.display_name}: {item.items_available}", callback_data=item)] for item in favorites
         ]
@@ -302,7 +297,7 @@ class Telegram(Notifier):
 
     @_private
     async def _cancel_orders_menu(self, update: Update, _) -> None:
-        self.reservations.update_active_orders()
+        await self._run_sync(self.reservations.update_active_orders)
         buttons = [
             [InlineKeyboardButton(order.display_name, callback_data=order)] for order in self.reservations.active_orders.values()
         ]
@@ -314,13 +309,13 @@ class Telegram(Notifier):
 
     @_private
     async def _cancel_all_orders(self, update: Update, _) -> None:
-        self.reservations.cancel_all_orders()
+        await self._run_sync(self.reservations.cancel_all_orders)
         await update.message.reply_text("Cancelled all active Orders")
         log.debug("Cancelled all active Orders")
 
     @_private
     async def _list_favorites(self, update: Update, _) -> None:
-        favorites = self.favorites.get_favorites()
+        favorites = await self._run_sync(self.favorites.get_favorites)
         if not favorites:
             await update.message.reply_text("You currently don't have any favorites.")
         else:
@@ -328,7 +323,7 @@ class Telegram(Notifier):
 
     @_private
     async def _list_favorite_ids(self, update: Update, _) -> None:
-        favorites = self.favorites.get_favorites()
+        favorites = await self._run_sync(self.favorites.get_favorites)
         if not favorites:
             await update.message.reply_text("You currently don't have any favorites.")
         else:
@@ -353,7 +348,7 @@ class Telegram(Notifier):
                 ),
             )
         )
-        self.favorites.add_favorites(item_ids)
+        await self._run_sync(self.favorites.add_favorites, item_ids)
         await update.message.reply_text(f"Added the following item ids to favorites: {' '.join(item_ids)}")
         log.debug('Added the following item ids to favorites: "%s"', item_ids)
 
@@ -376,15 +371,15 @@ class Telegram(Notifier):
                 ),
             )
         )
-        self.favorites.remove_favorite(item_ids)
+        await self._run_sync(self.favorites.remove_favorite, item_ids)
         await update.message.reply_text(f"Removed the following item ids from favorites: {' '.join(item_ids)}")
         log.debug("Removed the following item ids from favorites: '%s'", item_ids)
 
     @_private
     async def _url_handler(self, update: Update, context: CallbackContext) -> None:
         item_id = context.matches[0].group(1)
-        item_favorite = self.favorites.is_item_favorite(item_id)
-        item = self.favorites.get_item_by_id(item_id)
+        item_favorite = await self._run_sync(self.favorites.is_item_favorite, item_id)
+        item = await self._run_sync(self.favorites.get_item_by_id, item_id)
         if item.item_id is None:
             await update.message.reply_text("There is no Item with this link")
             return
@@ -437,16 +432,16 @@ class Telegram(Notifier):
             await update.callback_query.answer(f"Added {data.display_name} to reservation queue")
             log.debug('Added "%s" to reservation queue', data.display_name)
         if isinstance(data, Reservation):
-            self.reservations.reservation_query.remove(data)
+            self.reservations.remove(data.item_id)
             await update.callback_query.answer(f"Removed {data.display_name} form reservation queue")
             log.debug('Removed "%s" from reservation queue', data.display_name)
         if isinstance(data, Order):
-            self.reservations.cancel_order(data.id)
+            await self._run_sync(self.reservations.cancel_order, data.id)
             await update.callback_query.answer(f"Canceled Order for {data.display_name}")
             log.debug('Canceled order for "%s"', data.display_name)
         if isinstance(data, AddFavoriteRequest):
             if data.proceed:
-                self.favorites.add_favorites([data.item_id])
+                await self._run_sync(self.favorites.add_favorites, [data.item_id])
                 await update.callback_query.edit_message_text(f"Added {data.item_display_name} to favorites")
                 log.debug('Added "%s" to favorites', data.item_display_name)
                 log.debug('Removed "%s" from favorites', data.item_display_name)
@@ -454,7 +449,7 @@ class Telegram(Notifier):
                 await update.callback_query.delete_message()
         if isinstance(data, RemoveFavoriteRequest):
             if data.proceed:
-                self.favorites.remove_favorite([data.item_id])
+                await self._run_sync(self.favorites.remove_favorite, [data.item_id])
                 await update.callback_query.edit_message_text(f"Removed {data.item_display_name} from favorites")
                 log.debug('Removed "%s" from favorites', data.item_display_name)
             else:
@@ -5,9 +5,11 @@ import requests
 from requests.auth import HTTPBasicAuth
 
 from tgtg_scanner.errors import MaskConfigurationError, WebHookConfigurationError
-from tgtg_scanner.models import Config, Favorites, Item, Reservations
+from tgtg_scanner.models import Config, Favorites, Item, ItemBatch, Reservations
 from tgtg_scanner.models.reservations import Reservation
+from tgtg_scanner.models.template import escape_json
 from tgtg_scanner.notifiers.base import Notifier
+from tgtg_scanner.tgtg.tgtg_client import RETRY_STATUS_CODES
 
 log = logging.getLogger("tgtg")
 
@@ -27,7 +29,11 @@ class WebHook(Notifier):
         self.username: str | None = config.webhook.username
         self.password: str | None = config.webhook.password
         self.timeout: int = config.webhook.timeout
-        self.cron = config.webhook.cron
+        self._apply_config(config.webhook)
+        if self.type is not None and "json" in self.type:
+            # Batched JSON bodies are sent as array by default
+            self.batch_separator = ","
+            self.batch_body = self.batch_body or "[${{items}}]"
         if self.enabled:
             if self.method is None or self.url is None:
                 raise WebHookConfigurationError()
@@ -40,9 +46,9 @@ class WebHook(Notifier):
             except MaskConfigurationError as exc:
                 raise WebHookConfigurationError(exc.message) from exc
 
-    def _send(self, item: Item | Reservation) -> None:
+    def _send(self, item: Item | ItemBatch | Reservation) -> None:
         """Sends item information via configured Webhook endpoint."""
-        if isinstance(item, Item):
+        if isinstance(item, (Item, ItemBatch)):
             if self.url is None:
                 raise WebHookConfigurationError()
             url = item.unmask(self.url)
@@ -53,9 +59,10 @@ class WebHook(Notifier):
                 headers["Content-Type"] = self.type
             if self.body:
                 if self.type is not None and "json" in self.type:
-                    body = json.dumps(json.loads(item.unmask(self.body).replace("\n", "\\n"))).encode("utf-8")
+                    text = self._unmask_body(item, self.body, escape_json)
+                    body = json.dumps(json.loads(text.replace("\n", "\\n"))).encode("utf-8")
                 else:
-                    body = item.unmask(self.body).encode("utf-8")
+                    body = self._unmask_body(item, self.body).encode("utf-8")
                 log.debug("%s body: %s", self.name, body)
                 # body = item.unmask(self.body)
                 # if isinstance(body, bytes):
@@ -75,6 +82,9 @@ class WebHook(Notifier):
                 headers=headers,
                 auth=self.auth,
             )
+            if res.status_code in RETRY_STATUS_CODES:
+                # Retried by the notifier
+                res.raise_for_status()
             if not res.ok:
                 log.error("%s Request failed with status code %s", self.name, res.status_code)
                 log.debug("%s Response content: %s", self.name, res.text)
@@ -1,26 +1,36 @@
+import heapq
 import logging
 import sys
-from random import random
-from time import sleep
+import threading
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
+from time import monotonic, sleep
 from typing import NoReturn
 
 from progress.spinner import Spinner
 
 from tgtg_scanner.errors import TgtgAPIError
 from tgtg_scanner.models import (
+    AdaptiveScheduler,
     Config,
     Cron,
     Favorites,
+    ImageCache,
     Item,
+    ItemSnapshot,
     Location,
     Metrics,
     Reservations,
+    StateSnapshot,
 )
 from tgtg_scanner.notifiers import Notifiers
 from tgtg_scanner.tgtg import TgtgClient
 
 log = logging.getLogger("tgtg")
 
+# Schedule key of the favorites poll
+FAVORITES = "favorites"
+
 
 class Activity:
     """Activity class that creates a spinner if active is True."""
@@ -49,9 +59,14 @@ class Scanner:
     def __init__(self, config: Config):
         self.config = config
         self.metrics = Metrics(self.config.metrics_port)
-        self.item_ids = set(self.config.item_ids)
+        self.item_ids = [
+            item_id for item_id in dict.fromkeys(self.config.item_ids + list(self.config.item_intervals)) if item_id != ""
+        ]
         self.cron = self.config.schedule_cron
-        self.state: dict[str, Item] = {}
+        self.state: dict[str, ItemSnapshot] = {}
+        self.snapshot = StateSnapshot(self.config.token_path, self.config.state_snapshot_interval)
+        # Amounts seen before the last restart, used until the items are seen again
+        self._restored_amounts = self.snapshot.load()
         self.notifiers: Notifiers | None = None
         self.location: Location | None = None
         self.tgtg_client = TgtgClient(
@@ -64,9 +79,37 @@ class Scanner:
             refresh_token=self.config.tgtg.refresh_token,
             datadome_cookie=self.config.tgtg.datadome,
             base_url=self.config.tgtg.base_url,
+            max_workers=self.config.workers,
+            max_request_rate=self.config.tgtg.max_request_rate,
+            request_burst=self.config.tgtg.request_burst,
+            token_path=self.config.token_path,
         )
+        self.metrics.request_rate.set_function(lambda: self.tgtg_client.rate_limiter.rate)
+        self.metrics.rate_limiter_tokens.set_function(lambda: self.tgtg_client.rate_limiter.tokens)
+        self.metrics.captcha_cooldown.set_function(lambda: self.tgtg_client.cooldown_remaining)
+        Item.image_cache = ImageCache(self.config.image_cache_size * 1024 * 1024, self.config.image_cache_path)
+        # Image urls of new items are prefetched for notifications with images
+        image = self.config.telegram.image if self.config.telegram.enabled else None
+        self._prefetch_image = {"${{item_logo_bytes}}": "item_logo", "${{item_cover_bytes}}": "item_cover"}.get(image or "")
         self.reservations = Reservations(self.tgtg_client)
         self.favorites = Favorites(self.tgtg_client)
+        self.executor = ThreadPoolExecutor(max_workers=max(self.config.workers, 1), thread_name_prefix="tgtg-worker")
+        # Orders are never delayed by item polls
+        self.order_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tgtg-order")
+        self._stop_event = threading.Event()
+        self.scheduler = AdaptiveScheduler(
+            sleep_time=self.config.sleep_time,
+            enabled=self.config.adaptive_polling,
+            min_sleep_time=self.config.min_sleep_time,
+            max_sleep_time=self.config.max_sleep_time,
+            requests_per_minute=self.config.requests_per_minute,
+            item_intervals=self.config.item_intervals,
+        )
+        # Heap of (due time, item id or FAVORITES)
+        self._queue: list[tuple[float, str]] = []
+        self._queue_condition = threading.Condition()
+        self._state_lock = threading.Lock()
+        self._saved_tokens: tuple[str | None, str | None, str | None] | None = None
 
     def _get_test_item(self) -> Item:
         """Returns an item for test notifications."""
@@ -74,75 +117,233 @@ class Scanner:
 
         if items:
             return items[0]
-        items = sorted(
-            [
-                Item(item, self.location, self.config.locale, self.config.time_format)
-                for item in self.tgtg_client.get_items(favorites_only=False, latitude=53.5511, longitude=9.9937, radius=50)
-            ],
-            key=lambda x: x.items_available,
-            reverse=True,
+        item = max(
+            self.tgtg_client.get_items(favorites_only=False, latitude=53.5511, longitude=9.9937, radius=50),
+            key=lambda x: x.get("items_available", 0),
         )
 
-        return items[0]
+        return Item(item, self.location, self.config.locale, self.config.time_format)
+
+    def _poll(self, key: str) -> None:
+        """Polls a single item or the favorites and schedules the next poll.
+
+        Args:
+            key (str): Item ID or FAVORITES
+
+        """
+        item_ids = [key]
+        requests = 1
+        try:
+            if self.tgtg_client.cooldown_remaining > 0:
+                # Keep the current state until the captcha cooldown ends
+                return
+            if key == FAVORITES:
+                # Explicitly configured items are checked by their own polls only
+                item_dicts = [
+                    item_dict
+                    for item_dict in self._fetch_favorites()
+                    if item_dict.get("item", {}).get("item_id") not in self.item_ids
+                ]
+                item_ids = [item_dict.get("item", {}).get("item_id") for item_dict in item_dicts]
+                requests = self.tgtg_client.favorites_page_count
+            else:
+                item_dict = self._fetch_item(key)
+                item_dicts = [] if item_dict is None else [item_dict]
+            self._update(item_dicts)
+            if key == FAVORITES:
+                if len(self.state) == 0:
+                    log.warning("No items in observation! Did you add any favorites?")
+                # A scan cycle ends with each favorites poll, the snapshot is written outside of the state lock
+                self.snapshot.cycle()
+        except Exception:
+            log.error("Job Error! - %s", sys.exc_info())
+        finally:
+            # The request budget is shared evenly by all scheduled polls
+            delay = self.scheduler.next_sleep(item_ids, requests * (len(self.item_ids) + 1))
+            self._schedule(key, max(delay, self.tgtg_client.cooldown_remaining))
+
+    def _schedule(self, key: str, delay: float) -> None:
+        """Schedules the next poll of an item or the favorites.
+
+        Args:
+            key (str): Item ID or FAVORITES
+            delay (float): seconds until the poll is due
+
+        """
+        with self._queue_condition:
+            heapq.heappush(self._queue, (monotonic() + delay, key))
+            self._queue_condition.notify()
+
+    def _dispatch(self) -> float:
+        """Submits all due polls to the executor.
+
+        Returns:
+            float: seconds until the next poll is due
 
-    def _job(self) -> None:
-        """Job iterates over all monitored items."""
+        """
+        with self._queue_condition:
+            now = monotonic()
+            while self._queue and self._queue[0][0] <= now:
+                _, key = heapq.heappop(self._queue)
+                self.executor.submit(self._poll, key)
+            return self._queue[0][0] - now if self._queue else float("inf")
+
+    def _update(self, item_dicts: list[dict]) -> None:
+        """Checks fetched items, makes pending orders and saves the tokens.
+
+        Args:
+            item_dicts (List): List of raw items
+
+        """
         if self.notifiers is None:
             raise RuntimeError("Notifiers not initialized!")
 
-        items: list[Item] = []
-        for item_id in self.item_ids:
-            try:
-                if item_id != "":
-                    item_dict = self.tgtg_client.get_item(item_id)
-                    items.append(Item(item_dict, self.location, self.config.locale, self.config.time_format))
-            except TgtgAPIError as err:
-                log.error(err)
-        items += self._get_favorites()
-        for item in items:
-            self._check_item(item)
-
-        amounts = {item_id: item.items_available for item_id, item in self.state.items() if item is not None}
-        log.debug("new State: %s", amounts)
-        self.reservations.make_orders(self.state, self.notifiers.send)
-
-        if len(self.state) == 0:
-            log.warning("No items in observation! Did you add any favorites?")
-
-        self.config.save_tokens(
+        notify: list[Item] = []
+        with self._state_lock:
+            for item, item_snapshot in self._changed_items(item_dicts):
+                if self._check_item(item, item_snapshot):
+                    notify.append(item)
+
+            amounts = {item_id: item.items_available for item_id, item in self.state.items()}
+            log.debug("new State: %s", amounts)
+            # Changed items are ordered by _check_item, only new and failed reservations are left
+            if self.reservations.item_ids:
+                self.order_executor.submit(self.reservations.make_orders, dict(self.state), self.notifiers.send, ())
+            self._save_tokens()
+        # Sent without the lock, a full notifier queue may block with the block policy
+        for item in notify:
+            self._send_messages(item)
+
+    def _save_tokens(self) -> None:
+        """Saves the tokens if they changed since the last call."""
+        tokens = (
             self.tgtg_client.access_token,
             self.tgtg_client.refresh_token,
             self.tgtg_client.datadome_cookie,
         )
+        if tokens != self._saved_tokens:
+            self._saved_tokens = tokens
+            self.config.save_tokens(*tokens)
 
-    def _get_favorites(self) -> list[Item]:
-        """Get favorites as list of Items.
+    def _fetch_item(self, item_id: str) -> dict | None:
+        """Get a single item by its ID.
 
         Returns:
-            List: List of items
+            dict: The raw item or None on API errors
 
         """
         try:
-            items = self.get_favorites()
+            return self.tgtg_client.get_item(item_id)
+        except TgtgAPIError as err:
+            log.error(err)
+            return None
+
+    def _fetch_favorites(self) -> list[dict]:
+        """Get favorites as list of raw items.
+
+        Returns:
+            List: List of raw items
+
+        """
+        try:
+            return self.get_favorites()
         except TgtgAPIError as err:
             log.error(err)
             return []
-        return [Item(item, self.location, self.config.locale, self.config.time_format) for item in items]
 
-    def _check_item(self, item: Item) -> None:
-        """Checks if the available item amount raised from zero to something
-        and triggers notifications.
+    def _get_favorites(self) -> list[Item]:
+        """Get favorites as list of Items.
+
+        Returns:
+            List: List of items
+
+        """
+        return [Item(item, self.location, self.config.locale, self.config.time_format) for item in self._fetch_favorites()]
+
+    def _changed_items(self, item_dicts: Iterable[dict]) -> list[tuple[Item, ItemSnapshot]]:
+        """Creates Items only for raw items that changed since the last cycle.
+
+        Args:
+            item_dicts (Iterable): Raw items
+
+        Returns:
+            List: List of changed items with their snapshots
+
+        """
+        changed: list[tuple[Item, ItemSnapshot]] = []
+        unchanged = 0
+        for item_dict in item_dicts:
+            item_snapshot = ItemSnapshot.from_dict(item_dict)
+            self.snapshot.seen(item_snapshot.item_id, item_snapshot.items_available)
+            state_item = self.state.get(item_snapshot.item_id)
+            if state_item is not None and state_item.fingerprint == item_snapshot.fingerprint:
+                unchanged += 1
+                continue
+            changed.append((Item(item_dict, self.location, self.config.locale, self.config.time_format), item_snapshot))
+        log.debug("%s changed and %s unchanged items", len(changed), unchanged)
+        self.metrics.items_changed.inc(len(changed))
+        self.metrics.items_unchanged.inc(unchanged)
+        return changed
+
+    def _check_item(self, item: Item, item_snapshot: ItemSnapshot) -> bool:
+        """Checks if the available item amount raised from zero to something.
+
+        Only the snapshot of the item is kept in the state.
+
+        Returns:
+            bool: True if notifications are due for the item
+
         """
         state_item = self.state.get(item.item_id)
         if state_item is not None:
-            if state_item.items_available == item.items_available:
-                return
+            previous_amount: int | None = state_item.items_available
+        else:
+            previous_amount = self._restored_amounts.pop(item.item_id, None)
+        if item.items_available > 0 and self.reservations.is_reserved(item.item_id):
+            self.order_executor.submit(self._make_order, item, monotonic())
+        self.scheduler.observe(item, previous_amount)
+        if self._prefetch_image:
+            Item.image_cache.prefetch([getattr(item, self._prefetch_image)])
+        # Keep the new fingerprint, even if only the pickup time or price changed
+        self.state[item.item_id] = item_snapshot
+        if state_item is not None and previous_amount == item.items_available:
+            return False
+        notify = False
+        if previous_amount is not None and previous_amount != item.items_available:
             log.info("%s - new amount: %s", item.display_name, item.items_available)
-            if state_item.items_available == 0 and item.items_available > 0:
-                self._send_messages(item)
+            if previous_amount == 0 and item.items_available > 0:
+                notify = True
                 self.metrics.send_notifications.labels(item.item_id, item.display_name).inc()
         self.metrics.update(item)
-        self.state[item.item_id] = item
+        return notify
+
+    def _make_order(self, item: Item, seen_at: float) -> None:
+        """Orders a reserved item right after its stock was seen.
+
+        Args:
+            item (Item): Item with available bags
+            seen_at (float): Monotonic time the stock was seen
+
+        """
+        if self.notifiers is None:
+            raise RuntimeError("Notifiers not initialized!")
+        if self.reservations.make_order(item.item_id, self.notifiers.send, item.items_available):
+            latency = monotonic() - seen_at
+            self.metrics.order_latency.observe(latency)
+            log.info("Ordered %s %.3f seconds after stock was seen", item.display_name, latency)
+
+    def _reservation_loop(self) -> None:
+        """Polls items with pending reservations every reservation_sleep_time seconds."""
+        while not self._stop_event.wait(self.config.reservation_sleep_time):
+            if not self.cron.is_now or self.tgtg_client.cooldown_remaining > 0:
+                continue
+            item_ids = self.reservations.item_ids
+            try:
+                # Fetched on this thread, so reservations never wait for busy poll workers
+                item_dicts = [item for item in map(self._fetch_item, item_ids) if item is not None]
+                self._update(item_dicts)
+            except Exception:
+                log.error("Reservation Job Error! - %s", sys.exc_info())
 
     def _send_messages(self, item: Item) -> None:
         """Send notifications for Item."""
@@ -160,11 +361,7 @@ class Scanner:
         """Main Loop of the Scanner."""
         # test tgtg API
         self.tgtg_client.login()
-        self.config.save_tokens(
-            self.tgtg_client.access_token,
-            self.tgtg_client.refresh_token,
-            self.tgtg_client.datadome_cookie,
-        )
+        self._save_tokens()
         # activate location service
         self.location = Location(
             self.config.location.enabled,
@@ -175,31 +372,31 @@ class Scanner:
         if self.config.metrics:
             self.metrics.enable_metrics()
         self.notifiers = Notifiers(self.config, self.reservations, self.favorites)
+        self.notifiers.watch_queues(self.metrics)
         self.notifiers.start()
         if not self.config.disable_tests and self.notifiers.notifier_count > 0:
             log.info("Sending test Notifications ...")
             self.notifiers.send(self._get_test_item())
         # start scanner
+        if self.config.reservation_sleep_time > 0:
+            threading.Thread(target=self._reservation_loop, name="tgtg-reservations", daemon=True).start()
         log.info("Scanner started ...")
         running = True
         if self.cron != Cron("* * * * *"):
             log.info("Active on schedule: %s", self.cron.get_description(self.config.locale))
         activity = Activity(self.config.activity and not (self.config.docker or self.config.quiet))
+        for key in [FAVORITES, *self.item_ids]:
+            self._schedule(key, 0)
         while True:
             if self.cron.is_now:
                 if not running:
                     log.info("Scanner reenabled by cron schedule.")
                     running = True
-                try:
-                    self._job()
-                except Exception:
-                    log.error("Job Error! - %s", sys.exc_info())
-                finally:
-                    sleep_time = self.config.sleep_time * (0.9 + 0.2 * random())
-                    for _ in range(int(sleep_time)):
-                        activity.next()
-                        sleep(sleep_time / int(sleep_time))
-                        activity.flush()
+                wait = self._dispatch()
+                activity.next()
+                with self._queue_condition:
+                    self._queue_condition.wait(min(wait, 1))
+                activity.flush()
             elif running:
                 log.info("Scanner disabled by cron schedule.")
                 running = False
@@ -208,6 +405,12 @@ class Scanner:
 
     def stop(self) -> None:
         """Stop scanner."""
+        self._stop_event.set()
+        self.snapshot.save()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        self.order_executor.shutdown(wait=False, cancel_futures=True)
+        self.tgtg_client.token_manager.stop()
+        Item.image_cache.stop()
         if self.notifiers:
             self.notifiers.stop()
 
@@ -0,0 +1,129 @@
+import json
+import logging
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+log = logging.getLogger("tgtg")
+
+APK_VERSION_FILE = "apkVersion"
+APK_VERSION_TTL = 24 * 3600  # Seconds
+APK_VERSION_MAX_AGE = 7 * 24 * 3600  # Seconds
+
+
+class ApkVersionCache:
+    """Caches the latest APK version of the official Android TGTG App.
+
+    Cached versions younger than `ttl` are returned directly. Older versions
+    are still returned while a background thread fetches the latest version.
+    The version is only fetched synchronously if there is no cached version
+    or it is older than `max_age`.
+    """
+
+    def __init__(
+        self,
+        fetch: Callable[[], str],
+        default: str,
+        path: str | None = None,
+        ttl: int = APK_VERSION_TTL,
+        max_age: int = APK_VERSION_MAX_AGE,
+        on_refresh: Callable[[str], None] | None = None,
+    ):
+        """
+        Args:
+            fetch (Callable): Function returning the latest APK version
+            default (str): APK version used if fetching fails
+            path (str): Optional directory to persist the version
+            ttl (int): Seconds until the version is refreshed in the background
+            max_age (int): Seconds until the version is refreshed synchronously
+            on_refresh (Callable): Called with the new version when a refresh changed it
+
+        """
+        self.fetch = fetch
+        self.default = default
+        self.file = Path(path, APK_VERSION_FILE) if path else None
+        self.ttl = ttl
+        self.max_age = max_age
+        self.on_refresh = on_refresh
+        self.version: str | None = None
+        self.updated = 0.0
+        self._lock = threading.Lock()
+        self._refresh_thread: threading.Thread | None = None
+        self._load()
+
+    @property
+    def age(self) -> float:
+        """Seconds since the version was fetched."""
+        return time.time() - self.updated
+
+    def get(self) -> str:
+        """Returns the cached APK version.
+
+        Returns:
+            str: APK Version string
+
+        """
+        if self.version is None or self.age > self.max_age:
+            try:
+                return self.refresh()
+            except Exception:
+                log.warning("Failed to get latest APK version!")
+                # Use the default version and retry in the background next time
+                self.version = self.default
+                self.updated = time.time() - self.ttl
+                return self.version
+        if self.age > self.ttl:
+            self.refresh_in_background()
+        return self.version
+
+    def refresh(self) -> str:
+        """Fetches and caches the latest APK version.
+
+        Returns:
+            str: APK Version string
+
+        """
+        version = self.fetch()
+        with self._lock:
+            changed = version != self.version
+            self.version = version
+            self.updated = time.time()
+            self._save()
+        if changed and self.on_refresh is not None:
+            self.on_refresh(version)
+        return version
+
+    def refresh_in_background(self) -> None:
+        """Fetches the latest APK version in a background thread."""
+        with self._lock:
+            if self._refresh_thread and self._refresh_thread.is_alive():
+                return
+            self._refresh_thread = threading.Thread(target=self._background_refresh, name="tgtg-apk-version", daemon=True)
+            self._refresh_thread.start()
+
+    def _background_refresh(self) -> None:
+        try:
+            self.refresh()
+        except Exception as err:
+            log.warning("Failed to refresh APK version - %s", err)
+
+    def _load(self) -> None:
+        if self.file is None:
+            return
+        try:
+            data = json.loads(self.file.read_text(encoding="utf-8"))
+            self.version = str(data["version"])
+            self.updated = float(data["updated"])
+        except FileNotFoundError:
+            pass
+        except (OSError, ValueError, KeyError, TypeError) as err:
+            log.warning("Failed to read cached APK version - %s", err)
+
+    def _save(self) -> None:
+        if self.file is None:
+            return
+        try:
+            self.file.write_text(json.dumps({"version": self.version, "updated": self.updated}), encoding="utf-8")
+        except OSError as err:
+            log.warning("Failed to save APK version - %s", err)
@@ -0,0 +1,107 @@
+import logging
+import threading
+import time
+
+log = logging.getLogger("tgtg")
+
+# Default lowest request rate the governor decreases to in requests per minute
+MIN_REQUEST_RATE = 1
+# Factor applied to the request rate on captcha errors
+RATE_DECREASE_FACTOR = 0.5
+# Part of the max request rate added per successful request
+RATE_INCREASE_STEP = 0.01
+
+
+class RateLimiter:
+    """Token bucket rate limiter with an AIMD governor.
+
+    The bucket refills with the current request rate up to `burst` tokens.
+    Every request takes one token and waits if the bucket is empty.
+    Captcha errors empty the bucket and decrease the request rate multiplicatively,
+    successful requests increase it additively up to `max_rate`.
+    """
+
+    def __init__(self, max_rate: int = 300, burst: int = 10, min_rate: float = MIN_REQUEST_RATE):
+        """
+        Args:
+            max_rate (int): max requests per minute, 0 disables rate limiting
+            burst (int): bucket capacity
+            min_rate (float): lowest requests per minute the governor decreases to
+
+        """
+        self.max_rate = max_rate
+        self.min_rate = min(min_rate, max_rate)
+        self.burst = max(burst, 1)
+        self._rate = float(max_rate)
+        self._tokens = float(self.burst)
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def rate(self) -> float:
+        """Current request rate in requests per minute."""
+        return self._rate
+
+    @property
+    def tokens(self) -> float:
+        """Current bucket level."""
+        with self._lock:
+            self._refill()
+            return self._tokens
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._last_refill) * self._rate / 60)
+        self._last_refill = now
+
+    def acquire(self, timeout: float | None = None) -> bool:
+        """Takes a token from the bucket and waits until it is available.
+
+        Args:
+            timeout (float): max seconds to wait, None waits as long as needed
+
+        Returns:
+            bool: False if no token is available within the timeout, nothing is taken then
+
+        """
+        wait = self.reserve(timeout)
+        if wait is None:
+            return False
+        if wait > 0:
+            time.sleep(wait)
+        return True
+
+    def reserve(self, timeout: float | None = None) -> float | None:
+        """Takes a token from the bucket without waiting for it.
+
+        Args:
+            timeout (float): max seconds to wait, None waits as long as needed
+
+        Returns:
+            float: seconds until the token is available, None if that exceeds the timeout
+
+        """
+        if self.max_rate <= 0:
+            return 0
+        with self._lock:
+            self._refill()
+            wait = (1 - self._tokens) * 60 / self._rate if self._tokens < 1 else 0
+            if timeout is not None and wait > timeout:
+                return None
+            # The token is reserved right away, so waiting callers are served in order
+            self._tokens -= 1
+        return wait
+
+    def increase(self) -> None:
+        """Raises the request rate after a successful request."""
+        with self._lock:
+            self._refill()
+            self._rate = min(self.max_rate, self._rate + self.max_rate * RATE_INCREASE_STEP)
+
+    def decrease(self) -> None:
+        """Lowers the request rate and empties the bucket after a captcha error."""
+        with self._lock:
+            self._refill()
+            self._tokens = min(self._tokens, 0)
+            self._rate = max(self.min_rate, self._rate * RATE_DECREASE_FACTOR)
+        log.debug("Lowered request rate to %.1f requests per minute", self._rate)
@@ -6,6 +6,7 @@ import random
 import re
 import time
 import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from http import HTTPStatus
 from urllib.parse import urljoin, urlsplit
@@ -16,10 +17,15 @@ from urllib3.util import Retry
 
 from tgtg_scanner.errors import (
     TgtgAPIError,
+    TgtgCaptchaError,
     TGTGConfigurationError,
     TgtgLoginError,
     TgtgPollingError,
 )
+from tgtg_scanner.tgtg.apk_version import ApkVersionCache
+from tgtg_scanner.tgtg.json_decoder import loads
+from tgtg_scanner.tgtg.rate_limiter import RateLimiter
+from tgtg_scanner.tgtg.token_manager import TokenManager
 
 log = logging.getLogger("tgtg")
 BASE_URL = "https://apptoogoodtogo.com/api/"
@@ -45,6 +51,16 @@ DEFAULT_ACCESS_TOKEN_LIFETIME = 3600 * 4  # 4 hours
 DEFAULT_MAX_POLLING_TRIES = 24  # 24 * POLLING_WAIT_TIME = 2 minutes
 DEFAULT_POLLING_WAIT_TIME = 5  # Seconds
 DEFAULT_APK_VERSION = "24.11.0"
+FAVORITES_PAGE_SIZE = 100
+MAX_CAPTCHA_ERRORS = 10
+CAPTCHA_COOLDOWN = 10 * 60  # Seconds
+CAPTCHA_MAX_WAIT = 30  # Seconds a captcha retry may wait for the rate limiter
+# Lowest request rate after captcha errors, a retry always gets a token within CAPTCHA_MAX_WAIT,
+# so repeated captcha errors reach the cooldown instead of failing early
+CAPTCHA_MIN_REQUEST_RATE = 60 / CAPTCHA_MAX_WAIT  # Requests per minute
+CAPTCHA_RETRY_DELAY = 1  # Min seconds between captcha retries
+# Status codes of transient errors, requests failing with them are retried
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
 
 APK_RE_SCRIPT = re.compile(r"AF_initDataCallback\({key:\s*'ds:5'.*?data:([\s\S]*?), sideChannel:.+<\/script")
 
@@ -53,7 +69,7 @@ class TgtgSession(requests.Session):
     http_adapter = HTTPAdapter(
         max_retries=Retry(
             total=5,
-            status_forcelist=[429, 500, 502, 503, 504],
+            status_forcelist=RETRY_STATUS_CODES,
             allowed_methods=["GET", "POST"],
             backoff_factor=1,
         )
@@ -123,6 +139,10 @@ class TgtgClient:
         max_polling_tries=DEFAULT_MAX_POLLING_TRIES,
         polling_wait_time=DEFAULT_POLLING_WAIT_TIME,
         device_type="ANDROID",
+        max_workers=1,
+        max_request_rate=300,
+        request_burst=10,
+        token_path=None,
     ):
         if base_url != BASE_URL:
             log.warning("Using custom tgtg base url: %s", base_url)
@@ -135,6 +155,8 @@ class TgtgClient:
         self.datadome_cookie = datadome_cookie
 
         self.last_time_token_refreshed = None
+        # Access token ttl in seconds as returned by the API
+        self.access_token_ttl = None
         self.access_token_lifetime = access_token_lifetime
         self.max_polling_tries = max_polling_tries
         self.polling_wait_time = polling_wait_time
@@ -142,14 +164,30 @@ class TgtgClient:
         self.device_type = device_type
         self.fixed_user_agent = user_agent
         self.user_agent = user_agent
+        self.apk_version = ApkVersionCache(
+            self.get_latest_apk_version,
+            DEFAULT_APK_VERSION,
+            token_path,
+            on_refresh=lambda version: self._set_user_agent(self._get_user_agent(version)),
+        )
         self.language = language
         self.proxies = proxies
         self.timeout = timeout
+        self.max_workers = max_workers
         self.session = None
 
+        # Number of favorites pages found on the last call of get_favorites
+        self.favorites_page_count = 1
+
         self.captcha_error_count = 0
+        # Monotonic time until requests are paused after too many captcha errors
+        self.cooldown_until = 0.0
+        # Shared by all threads using this client
+        self.rate_limiter = RateLimiter(max_request_rate, request_burst, CAPTCHA_MIN_REQUEST_RATE)
+        self.token_manager = TokenManager(self._login, access_token_lifetime)
 
     def __del__(self) -> None:
+        self.token_manager.stop()
         if self.session:
             self.session.close()
 
@@ -183,52 +221,79 @@ class TgtgClient:
             "datadome_cookie": self.datadome_cookie,
         }
 
+    @property
+    def cooldown_remaining(self) -> float:
+        """Seconds until requests are sent again after too many captcha errors."""
+        return max(self.cooldown_until - time.monotonic(), 0)
+
+    def _check_cooldown(self) -> None:
+        """Fails fast while the captcha cooldown is active."""
+        if not self.cooldown_until:
+            return
+        remaining = self.cooldown_remaining
+        if remaining > 0:
+            raise TgtgCaptchaError(f"Too many captcha errors! Retrying in {remaining:.0f} seconds")
+        log.info("Captcha cooldown ended. Retrying ...")
+        self.cooldown_until = 0.0
+
     def _post(self, path, **kwargs) -> requests.Response:
-        if not self.session:
-            self.session = self._create_session()
-        response = self.session.post(
-            self._get_url(path),
-            access_token=self.access_token,
-            **kwargs,
-        )
-        self.datadome_cookie = self.session.cookies.get("datadome")
-        if response.status_code in (HTTPStatus.OK, HTTPStatus.ACCEPTED):
-            self.captcha_error_count = 0
-            return response
-        # Status Code == 403
-        # --> Blocked due to rate limit / wrong user_agent.
-        # 1. Try: Get latest APK Version from google
-        # 2. Try: Reset session
-        # 3. Try: Delete datadome cookie and reset session
-        # 10.Try: Sleep 10 minutes, and reset session
-        if response.status_code == 403:
+        while True:
+            self._check_cooldown()
+            if not self.captcha_error_count:
+                self.rate_limiter.acquire()
+            elif not self.rate_limiter.acquire(CAPTCHA_MAX_WAIT):
+                # Other callers took the tokens of the lowered rate, fail fast instead of blocking
+                raise TgtgCaptchaError(f"Captcha error! Request rate lowered to {self.rate_limiter.rate:.1f} per minute")
+            if not self.session:
+                self.session = self._create_session()
+            response = self.session.post(
+                self._get_url(path),
+                access_token=self.access_token,
+                **kwargs,
+            )
+            self.datadome_cookie = self.session.cookies.get("datadome")
+            if response.status_code in (HTTPStatus.OK, HTTPStatus.ACCEPTED):
+                self.captcha_error_count = 0
+                self.rate_limiter.increase()
+                return response
+            if response.status_code != 403:
+                raise TgtgAPIError(response.status_code, response.content)
+            # Status Code == 403
+            # --> Blocked due to rate limit / wrong user_agent.
+            # Every try lowers the request rate and empties the rate limiter bucket.
+            # 1. Try: Get latest APK Version from google in the background
+            # 2. Try: Reset session
+            # 3. Try: Delete datadome cookie and reset session
+            # 10.Try: Pause all requests for 10 minutes, and reset session
             log.debug("Captcha Error 403!")
             self.captcha_error_count += 1
+            self.rate_limiter.decrease()
             if self.captcha_error_count == 1:
-                self.user_agent = self._get_user_agent()
+                # The user agent is updated again when the background refresh finds a new version
+                if not self.fixed_user_agent:
+                    self.apk_version.refresh_in_background()
+                self._set_user_agent(self._get_user_agent())
             elif self.captcha_error_count == 2:
                 self.session = self._create_session()
             elif self.captcha_error_count == 4:
                 self.datadome_cookie = None
                 self.session = self._create_session()
-            elif self.captcha_error_count >= 10:
-                log.warning("Too many captcha Errors! Sleeping for 10 minutes...")
-                time.sleep(10 * 60)
-                log.info("Retrying ...")
+            elif self.captcha_error_count >= MAX_CAPTCHA_ERRORS:
+                log.warning("Too many captcha Errors! Pausing requests for %s minutes...", CAPTCHA_COOLDOWN // 60)
+                self.cooldown_until = time.monotonic() + CAPTCHA_COOLDOWN
                 self.captcha_error_count = 0
                 self.session = self._create_session()
-            time.sleep(1)
-            return self._post(path, **kwargs)
-        raise TgtgAPIError(response.status_code, response.content)
+            time.sleep(CAPTCHA_RETRY_DELAY)
 
-    def _get_user_agent(self) -> str:
+    def _set_user_agent(self, user_agent: str) -> None:
+        self.user_agent = user_agent
+        if self.session:
+            self.session.headers["user-agent"] = user_agent
+
+    def _get_user_agent(self, version: str | None = None) -> str:
         if self.fixed_user_agent:
             return self.fixed_user_agent
-        version = DEFAULT_APK_VERSION
-        try:
-            version = self.get_latest_apk_version()
-        except Exception:
-            log.warning("Failed to get latest APK version!")
+        version = version or self.apk_version.get()
         log.debug("Using APK version %s.", version)
         return random.choice(USER_AGENTS).format(version)
 
@@ -255,19 +320,30 @@ class TgtgClient:
         return bool(self.access_token and self.refresh_token)
 
     def _refresh_token(self) -> None:
-        if (
-            self.last_time_token_refreshed
-            and (datetime.now() - self.last_time_token_refreshed).seconds <= self.access_token_lifetime
-        ):
-            return
         response = self._post(REFRESH_ENDPOINT, json={"refresh_token": self.refresh_token})
-        self.access_token = response.json().get("access_token")
-        self.refresh_token = response.json().get("refresh_token")
+        self._set_tokens(loads(response.content))
+
+    def _set_tokens(self, data: dict) -> None:
+        self.access_token = data.get("access_token")
+        self.refresh_token = data.get("refresh_token")
+        self.access_token_ttl = data.get("access_token_ttl_seconds", data.get("expires_in"))
         self.last_time_token_refreshed = datetime.now()
 
     def login(self) -> None:
+        # The token manager refreshes the token in the background before it expires
+        if self.token_manager.valid:
+            return
         if not (self.email or self.access_token and self.refresh_token):
             raise TGTGConfigurationError("You must provide at least email or access_token and refresh_token")
+        self.token_manager.ensure()
+
+    def _login(self) -> int | None:
+        """Refreshes the tokens or logs in by email.
+
+        Returns:
+            int: access token ttl in seconds if known
+
+        """
         if self._already_logged:
             self._refresh_token()
         else:
@@ -288,6 +364,7 @@ class TgtgClient:
                 self.start_polling(first_login_response.get("polling_id"))
             else:
                 raise TgtgLoginError(response.status_code, response.content)
+        return self.access_token_ttl
 
     def start_polling(self, polling_id) -> None:
         for _ in range(self.max_polling_tries):
@@ -307,10 +384,7 @@ class TgtgClient:
                 continue
             if response.status_code == HTTPStatus.OK:
                 log.info("Logged in!")
-                login_response = response.json()
-                self.access_token = login_response.get("access_token")
-                self.refresh_token = login_response.get("refresh_token")
-                self.last_time_token_refreshed = datetime.now()
+                self._set_tokens(response.json())
                 return
         raise TgtgPollingError("Max polling retries reached. Try again.")
 
@@ -334,8 +408,49 @@ class TgtgClient:
         we_care_only=False,
     ) -> list[dict]:
         self.login()
+        response = self._post(
+            API_ITEM_ENDPOINT,
+            json=self._get_items_data(
+                latitude=latitude,
+                longitude=longitude,
+                radius=radius,
+                page_size=page_size,
+                page=page,
+                discover=discover,
+                favorites_only=favorites_only,
+                item_categories=item_categories,
+                diet_categories=diet_categories,
+                pickup_earliest=pickup_earliest,
+                pickup_latest=pickup_latest,
+                search_phrase=search_phrase,
+                with_stock_only=with_stock_only,
+                hidden_only=hidden_only,
+                we_care_only=we_care_only,
+            ),
+        )
+        return loads(response.content).get("items", [])
+
+    @staticmethod
+    def _get_items_data(
+        *,
+        latitude=0.0,
+        longitude=0.0,
+        radius=21,
+        page_size=20,
+        page=1,
+        discover=False,
+        favorites_only=True,
+        item_categories=None,
+        diet_categories=None,
+        pickup_earliest=None,
+        pickup_latest=None,
+        search_phrase=None,
+        with_stock_only=False,
+        hidden_only=False,
+        we_care_only=False,
+    ) -> dict:
         # fields are sorted like in the app
-        data = {
+        return {
             "origin": {"latitude": latitude, "longitude": longitude},
             "radius": radius,
             "page_size": page_size,
@@ -351,8 +466,6 @@ class TgtgClient:
             "hidden_only": hidden_only,
             "we_care_only": we_care_only,
         }
-        response = self._post(API_ITEM_ENDPOINT, json=data)
-        return response.json().get("items", [])
 
     def get_item(self, item_id: str) -> dict:
         self.login()
@@ -360,25 +473,34 @@ class TgtgClient:
             f"{API_ITEM_ENDPOINT}/{item_id}",
             json={"origin": None},
         )
-        return response.json()
+        return loads(response.content)
 
     def get_favorites(self) -> list[dict]:
         """Returns favorites of the current tgtg account.
 
+        All pages found on the last call are requested in parallel.
+        Further pages are probed one by one as long as the last page is full.
+
         Returns:
             List: List of items
 
         """
-        items = []
-        page = 1
-        page_size = 100
-        while True:
-            new_items = self.get_items(favorites_only=True, page_size=page_size, page=page)
-            items += new_items
-            if len(new_items) < page_size:
-                break
-            page += 1
-        return items
+        pages = self._get_favorites_pages(range(1, self.favorites_page_count + 1))
+        while len(pages[-1]) == FAVORITES_PAGE_SIZE:
+            pages += self._get_favorites_pages([len(pages) + 1])
+        # Favorites may have shrunk since the last call. Drop surplus pages.
+        page_count = next(i for i, page in enumerate(pages, 1) if len(page) < FAVORITES_PAGE_SIZE)
+        self.favorites_page_count = page_count
+        return [item for page in pages[:page_count] for item in page]
+
+    def _get_favorites_pages(self, pages: range | list[int]) -> list[list[dict]]:
+        def get_page(page: int) -> list[dict]:
+            return self.get_items(favorites_only=True, page_size=FAVORITES_PAGE_SIZE, page=page)
+
+        if self.max_workers <= 1 or len(pages) <= 1:
+            return [get_page(page) for page in pages]
+        with ThreadPoolExecutor(max_workers=min(self.max_workers, len(pages))) as executor:
+            return list(executor.map(get_page, pages))
 
     def set_favorite(self, item_id: str, is_favorite: bool) -> None:
         self.login()
@@ -399,6 +521,28 @@ class TgtgClient:
         response = self._post(ORDER_STATUS_ENDPOINT.format(order_id))
         return response.json()
 
+    def get_active_orders(self) -> list[dict]:
+        """Returns all active orders of the current tgtg account in one request.
+
+        Returns:
+            List: List of orders
+
+        """
+        self.login()
+        response = self._post(ACTIVE_ORDER_ENDPOINT, json={})
+        return loads(response.content).get("orders", [])
+
+    def get_inactive_orders(self, page: int = 0, page_size: int = 20) -> list[dict]:
+        """Returns a page of past orders of the current tgtg account.
+
+        Returns:
+            List: List of orders
+
+        """
+        self.login()
+        response = self._post(INACTIVE_ORDER_ENDPOINT, json={"paging": {"page": page, "size": page_size}})
+        return loads(response.content).get("orders", [])
+
     def abort_order(self, order_id: str) -> None:
         """Use this when your order is not yet paid."""
         self.login()
@@ -0,0 +1,70 @@
+import logging
+import threading
+from collections.abc import Callable
+
+log = logging.getLogger("tgtg")
+
+# Part of the access token ttl after which the token is refreshed
+TOKEN_REFRESH_RATIO = 0.9
+
+
+class TokenManager:
+    """Keeps the access token valid by refreshing it ahead of expiry.
+
+    After each refresh a timer refreshes the token again in the background,
+    so callers only have to check `valid`. Concurrent callers wait on a
+    single refresh. If a background refresh fails, the next caller
+    refreshes inline.
+    """
+
+    def __init__(self, refresh: Callable[[], int | None], lifetime: int):
+        """
+        Args:
+            refresh (Callable): Refreshes the token and returns its ttl in seconds if known
+            lifetime (int): Max seconds between two refreshes
+
+        """
+        self.refresh = refresh
+        self.lifetime = lifetime
+        self.valid = False
+        self._lock = threading.Lock()
+        self._timer: threading.Timer | None = None
+
+    def ensure(self) -> None:
+        """Refreshes the token unless it is valid."""
+        if self.valid:
+            return
+        with self._lock:
+            # Another caller may have refreshed while we waited
+            if not self.valid:
+                self._refresh()
+
+    def invalidate(self) -> None:
+        """Forces a refresh on the next call of ensure."""
+        self.valid = False
+
+    def stop(self) -> None:
+        """Cancels the scheduled background refresh."""
+        if self._timer:
+            self._timer.cancel()
+
+    def _refresh(self) -> None:
+        ttl = self.refresh()
+        interval = float(self.lifetime)
+        if ttl:
+            interval = min(interval, ttl * TOKEN_REFRESH_RATIO)
+        self.valid = True
+        self.stop()
+        self._timer = threading.Timer(interval, self._background_refresh)
+        self._timer.name = "tgtg-token-refresh"
+        self._timer.daemon = True
+        self._timer.start()
+        log.debug("Next access token refresh in %.0f seconds", interval)
+
+    def _background_refresh(self) -> None:
+        with self._lock:
+            try:
+                self._refresh()
+            except Exception as err:
+                log.warning("Failed to refresh access token - %s", err)
+                self.valid = False